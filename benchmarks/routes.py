@@ -0,0 +1,365 @@
+"""Load test of the TeamZ routes.
+
+Seeds a fresh SQLite database, requests every team, player and user route
+as JSON and as HTML and reports latency percentiles, throughput and SQL
+statements per request. Results can be written as JSON and compared with
+those of another commit:
+
+    python -m benchmarks.routes --requests 200 --output before.json
+    python -m benchmarks.routes --requests 200 --compare before.json
+
+Requests go through the Flask test client by default. With --server the
+app is served over HTTP by a local gunicorn (teamg.py, WSGI) or uvicorn
+(teama.py, ASGI) and requested from --concurrency threads; statements are
+only counted in-process. To compare the two modes:
+
+    python -m benchmarks.routes --server gunicorn --concurrency 64 \
+        --route /team/1 --route /player/ --output wsgi.json
+    python -m benchmarks.routes --server uvicorn --workers 1 --concurrency 64 \
+        --route /team/1 --route /player/ --compare wsgi.json
+"""
+
+import argparse
+import http.cookiejar
+import itertools
+import json
+import math
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from flask_jwt_extended import create_access_token
+from flask_migrate import upgrade
+from sqlalchemy import event
+import teamz
+from benchmarks.seed import PASSWORD, seed
+from resources.db import db
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+Route = namedtuple("Route", "method path representation body", defaults=(None,))
+
+ROUTES = [
+    Route("GET", "/team/", "html"),
+    Route("GET", "/team/", "json"),
+    Route("GET", "/team/1", "html"),
+    Route("GET", "/team/1", "json"),
+    Route("GET", "/team/1/players", "json"),
+    Route("GET", "/team/create", "html"),
+    Route("GET", "/player/", "html"),
+    Route("GET", "/player/", "json"),
+    Route("GET", "/player/1", "html"),
+    Route("GET", "/player/1", "json"),
+    Route("GET", "/player/create", "html"),
+    Route("GET", "/user/", "html"),
+    Route("GET", "/user/", "json"),
+    Route("GET", "/user/1", "html"),
+    Route("GET", "/user/1", "json"),
+    Route("POST", "/team/", "json", lambda n: {"name": f"Benchmark team {n}"}),
+    Route("PUT", "/team/1", "json", lambda n: {"stadium": f"Stadium {n}"}),
+    Route(
+        "POST",
+        "/player/",
+        "json",
+        lambda n: {"name": f"Benchmark player {n}", "team_id": 1},
+    ),
+    Route("PUT", "/player/1", "json", lambda n: {"name": f"Player {n}"}),
+    Route(
+        "POST",
+        "/player/batch",
+        "json",
+        lambda n: [{"name": f"Batch player {n}.{i}", "team_id": 1} for i in range(10)],
+    ),
+]
+
+ACCEPT = {"json": "application/json", "html": "text/html"}
+
+SERVERS = {
+    "gunicorn": lambda port, workers: [
+        "gunicorn",
+        "--bind",
+        f"127.0.0.1:{port}",
+        "--workers",
+        str(workers),
+        "teamg:create_app()",
+    ],
+    "uvicorn": lambda port, workers: [
+        "uvicorn",
+        "--factory",
+        "teama:create_app",
+        "--port",
+        str(port),
+        "--workers",
+        str(workers),
+        "--log-level",
+        "warning",
+    ],
+}
+
+
+class InProcessClient:
+    """Requests the app through the Flask test client, counting the SQL
+    statements it runs."""
+
+    def __init__(self, app, token):
+        self.client = app.test_client()
+        self.token = token
+        self.statements = 0
+        self._lock = threading.Lock()
+        with app.app_context():
+            event.listen(db.engine, "before_cursor_execute", self._count)
+        self.client.post(
+            "/user/login", data={"username": "user1", "password": PASSWORD}
+        )
+
+    def _count(self, *args):
+        with self._lock:
+            self.statements += 1
+
+    def request(self, route, body=None):
+        response = self.client.open(
+            route.path,
+            method=route.method,
+            headers=headers(route, self.token),
+            json=body,
+        )
+        return response.status_code
+
+
+class HTTPClient:
+    """Requests a running server over HTTP, keeping the session cookie."""
+
+    statements = None
+
+    def __init__(self, base_url, token):
+        self.base_url = base_url
+        self.token = token
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar())
+        )
+        data = urllib.parse.urlencode({"username": "user1", "password": PASSWORD})
+        self.opener.open(f"{base_url}/user/login", data=data.encode()).read()
+
+    def request(self, route, body=None):
+        request = urllib.request.Request(
+            self.base_url + route.path,
+            method=route.method,
+            headers=headers(route, self.token),
+            data=None if body is None else json.dumps(body).encode(),
+        )
+        if body is not None:
+            request.add_header("Content-Type", "application/json")
+        try:
+            with self.opener.open(request) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+
+def headers(route, token):
+    result = {"Accept": ACCEPT[route.representation]}
+    if route.representation == "json":
+        result["Authorization"] = f"Bearer {token}"
+    return result
+
+
+def percentile(ordered, p):
+    return ordered[max(math.ceil(p / 100 * len(ordered)) - 1, 0)]
+
+
+def measure(client, route, requests, concurrency, warmup):
+    counter = itertools.count()
+
+    def send(_):
+        body = route.body(next(counter)) if route.body else None
+        start = time.perf_counter()
+        status = client.request(route, body)
+        return time.perf_counter() - start, status
+
+    for i in range(warmup):
+        send(i)
+    statements = client.statements
+    start = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(concurrency) as pool:
+            results = list(pool.map(send, range(requests)))
+    else:
+        results = [send(i) for i in range(requests)]
+    elapsed = time.perf_counter() - start
+    latencies = sorted(latency * 1000 for latency, _ in results)
+    return {
+        "route": f"{route.method} {route.path} {route.representation}",
+        "requests": requests,
+        "errors": sum(status >= 400 for _, status in results),
+        "mean_ms": round(sum(latencies) / len(latencies), 3),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p90_ms": round(percentile(latencies, 90), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "max_ms": round(latencies[-1], 3),
+        "throughput_rps": round(requests / elapsed, 1),
+        "statements": (
+            None
+            if statements is None
+            else round((client.statements - statements) / requests, 2)
+        ),
+    }
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def serve(server, database_url, workers):
+    """Starts ``server`` on a free port and waits until it accepts connections."""
+
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", *SERVERS[server](port, workers)],
+        cwd=ROOT,
+        env={**os.environ, "DATABASE_URL": database_url},
+    )
+    deadline = time.monotonic() + 30
+    while True:
+        if process.poll() is not None:
+            raise SystemExit(f"{server} exited before accepting connections")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return process, f"http://127.0.0.1:{port}"
+        except OSError:
+            if time.monotonic() > deadline:
+                process.terminate()
+                raise SystemExit(f"{server} did not start within 30 seconds")
+            time.sleep(0.2)
+
+
+def commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results):
+    print(
+        f"{'route':<28} {'errors':>6} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} "
+        f"{'req/s':>8} {'stmts':>6}"
+    )
+    for result in results:
+        statements = result["statements"]
+        print(
+            f"{result['route']:<28} {result['errors']:>6} {result['p50_ms']:>9.2f} "
+            f"{result['p90_ms']:>9.2f} {result['p99_ms']:>9.2f} "
+            f"{result['throughput_rps']:>8.1f} "
+            f"{'-' if statements is None else statements:>6}"
+        )
+
+
+def print_comparison(results, baseline):
+    """Changes from ``baseline``, negative being faster for the latencies."""
+
+    before = {result["route"]: result for result in baseline["results"]}
+    print(f"\ncompared with {baseline['meta'].get('commit') or 'baseline'}:")
+    print(f"{'route':<28} {'p50':>8} {'p99':>8} {'req/s':>8} {'stmts':>8}")
+    for result in results:
+        old = before.get(result["route"])
+        if old is None:
+            continue
+        changes = []
+        for key in ("p50_ms", "p99_ms", "throughput_rps"):
+            changes.append(
+                f"{(result[key] - old[key]) / old[key]:>+8.0%}" if old[key] else "-"
+            )
+        if result["statements"] is None or old["statements"] is None:
+            changes.append(f"{'-':>8}")
+        else:
+            changes.append(f"{result['statements'] - old['statements']:>+8.2f}")
+        print(f"{result['route']:<28} {' '.join(changes)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.split("\n\n")[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__.split("\n\n", 1)[1],
+    )
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--teams", type=int, default=20, help="per user")
+    parser.add_argument("--players", type=int, default=25, help="per team")
+    parser.add_argument("--requests", type=int, default=100, help="per route")
+    parser.add_argument("--warmup", type=int, default=5, help="per route")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--server", choices=sorted(SERVERS))
+    parser.add_argument("--workers", type=int, default=4, help="server processes")
+    parser.add_argument("--route", action="append", help="only paths containing")
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--compare", help="results JSON to compare with")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="teamz-benchmark-")
+    database_url = f"sqlite:///{os.path.join(directory, 'data.db')}"
+    os.environ["DATABASE_URL"] = database_url
+    app = teamz.create_app()
+    with app.app_context():
+        upgrade(directory=os.path.join(ROOT, "migrations"))
+        seed(args.users, args.teams, args.players)
+        token = create_access_token(identity=1)
+
+    server = None
+    if args.server:
+        server, base_url = serve(args.server, database_url, args.workers)
+        client = HTTPClient(base_url, token)
+    else:
+        client = InProcessClient(app, token)
+
+    routes = [
+        route
+        for route in ROUTES
+        if not args.route or any(path in route.path for path in args.route)
+    ]
+    try:
+        results = [
+            measure(client, route, args.requests, args.concurrency, args.warmup)
+            for route in routes
+        ]
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    print_results(results)
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(results, json.load(f))
+    if args.output:
+        meta = {
+            "commit": commit(),
+            "date": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "mode": args.server or "test-client",
+            **{key: value for key, value in vars(args).items() if key != "output"},
+        }
+        with open(args.output, "w") as f:
+            json.dump({"meta": meta, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+from datetime import date
+from sqlalchemy import insert
+from models import PlayersModel, TeamsModel
+from models.user import UsersModel
+from resources.db import db
+from resources.passwords import passwords
+
+PASSWORD = "benchmark"
+POSITIONS = ["GK", "CB", "RB", "LB", "DM", "CM", "AM", "RW", "LW", "CF"]
+
+
+def seed(users=1, teams=500, players=20):
+    """Fills an empty database with ``users`` users owning ``teams`` teams
+    each, every team with ``players`` players. Every user's password is
+    ``PASSWORD`` and their username ``user<N>``, counting from 1."""
+
+    hashed = passwords.hash(PASSWORD)
+    db.session.execute(
+        insert(UsersModel),
+        [
+            {
+                "username": f"user{i + 1}",
+                "email": f"user{i + 1}@example.com",
+                "password": hashed,
+            }
+            for i in range(users)
+        ],
+    )
+    db.session.execute(
+        insert(TeamsModel),
+        [
+            {
+                "name": f"Team {i}",
+                "foundation_date": date(1900 + i % 120, 1, 1),
+                "city": "Rio de Janeiro",
+                "state": "RJ",
+                "stadium": f"Stadium {i}",
+                "logo": f"https://example.com/{i}.png",
+                "owner_id": 1 + i // teams,
+            }
+            for i in range(users * teams)
+        ],
+    )
+    db.session.execute(
+        insert(PlayersModel),
+        [
+            {
+                "name": f"Player {i}",
+                "birth_date": date(1990, 1, 1 + i % 28),
+                "position": POSITIONS[i % len(POSITIONS)],
+                "team_id": 1 + i // players,
+            }
+            for i in range(users * teams * players)
+        ],
+    )
+    db.session.commit()
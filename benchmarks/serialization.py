@@ -0,0 +1,73 @@
+"""Compares the generated dump functions of the read-only schemas with
+marshmallow's own ``dump`` on the same rows, checking that both produce the
+same JSON before timing them.
+
+    python -m benchmarks.serialization --teams 500 --players 20
+"""
+
+import argparse
+import json
+import os
+import timeit
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from marshmallow import Schema
+from sqlalchemy.orm import joinedload
+import teamz
+from benchmarks.seed import seed
+from models import PlayerModel, PlayersModel, TeamsModel
+from resources.db import db
+from resources.schemas import PlayerSchema, PlayerUpdateSchema, TeamSchema
+
+
+def compare(name, schema, objs, number):
+    generated = json.dumps(schema.dump(objs), sort_keys=True)
+    reference = json.dumps(Schema.dump(schema, objs), sort_keys=True)
+    if generated != reference:
+        raise AssertionError(f"{name}: generated dump differs from marshmallow")
+    slow = timeit.timeit(lambda: Schema.dump(schema, objs), number=number) / number
+    fast = timeit.timeit(lambda: schema.dump(objs), number=number) / number
+    print(
+        f"{name:<32} {len(objs):>7} {slow * 1000:>14.2f} {fast * 1000:>14.2f} "
+        f"{slow / fast:>7.1f}x"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--teams", type=int, default=500)
+    parser.add_argument("--players", type=int, default=20, help="per team")
+    parser.add_argument("--number", type=int, default=5, help="runs per schema")
+    args = parser.parse_args()
+
+    app = teamz.create_app()
+    with app.app_context():
+        db.create_all()
+        seed(teams=args.teams, players=args.players)
+        print(
+            f"{'schema':<32} {'objects':>7} {'marshmallow ms':>14} "
+            f"{'generated ms':>14} {'speedup':>8}"
+        )
+        compare(
+            "TeamSchema(many=True)",
+            TeamSchema(many=True),
+            TeamsModel.query.all(),
+            args.number,
+        )
+        compare(
+            "PlayerUpdateSchema(many=True)",
+            PlayerUpdateSchema(many=True),
+            PlayersModel.query.all(),
+            args.number,
+        )
+        compare(
+            "PlayerSchema(many=True)",
+            PlayerSchema(many=True),
+            PlayerModel.query.options(joinedload(PlayerModel.team)).all(),
+            args.number,
+        )
+
+
+if __name__ == "__main__":
+    main()
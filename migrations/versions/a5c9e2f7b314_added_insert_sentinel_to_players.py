@@ -0,0 +1,26 @@
+"""Added insert sentinel to players
+
+Revision ID: a5c9e2f7b314
+Revises: f1b8d3e6a2c4
+Create Date: 2026-10-18 20:41:09.815273
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "a5c9e2f7b314"
+down_revision = "f1b8d3e6a2c4"
+branch_labels = None
+depends_on = None
+
+
+# Plain ALTER TABLEs rather than batch operations, which would recreate the
+# table and drop the search and statistics triggers on it.
+def upgrade():
+    op.add_column("players", sa.Column("sentinel", sa.Integer(), nullable=True))
+
+
+def downgrade():
+    op.drop_column("players", "sentinel")
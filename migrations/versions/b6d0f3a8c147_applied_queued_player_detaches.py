@@ -0,0 +1,30 @@
+"""Applied queued player detaches
+
+Revision ID: b6d0f3a8c147
+Revises: a5c9e2f7b314
+Create Date: 2026-10-18 21:26:53.604182
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "b6d0f3a8c147"
+down_revision = "a5c9e2f7b314"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # players of teams deleted while their detach was a job, which no worker
+    # runs any more now that deletes detach them in the same commit
+    op.execute(
+        "UPDATE players SET team_id = NULL, updated_at = CURRENT_TIMESTAMP, "
+        "version = version + 1 "
+        "WHERE team_id IS NOT NULL AND team_id NOT IN (SELECT id FROM teams)"
+    )
+    op.execute("DELETE FROM jobs WHERE name = 'detach-players'")
+
+
+def downgrade():
+    pass
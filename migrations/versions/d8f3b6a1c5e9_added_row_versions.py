@@ -0,0 +1,33 @@
+"""Added row versions
+
+Revision ID: d8f3b6a1c5e9
+Revises: c7a52e90d418
+Create Date: 2026-10-18 17:21:48.930215
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "d8f3b6a1c5e9"
+down_revision = "c7a52e90d418"
+branch_labels = None
+depends_on = None
+
+# Plain ALTER TABLEs rather than batch operations, which would recreate the
+# tables and drop the search and statistics triggers on them.
+TABLES = ("teams", "players")
+
+
+def upgrade():
+    for table in TABLES:
+        op.add_column(
+            table,
+            sa.Column("version", sa.Integer(), nullable=False, server_default="1"),
+        )
+
+
+def downgrade():
+    for table in TABLES:
+        op.drop_column(table, "version")
@@ -0,0 +1,33 @@
+"""Made job keys unique
+
+Revision ID: e4a7c2d9b816
+Revises: d8f3b6a1c5e9
+Create Date: 2026-10-18 18:05:12.447120
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "e4a7c2d9b816"
+down_revision = "d8f3b6a1c5e9"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # jobs queued twice by concurrent requests, of which the first is kept
+    op.execute(
+        "DELETE FROM jobs WHERE key IS NOT NULL AND id NOT IN "
+        "(SELECT MIN(id) FROM jobs WHERE key IS NOT NULL GROUP BY key)"
+    )
+    with op.batch_alter_table("jobs", schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f("ix_jobs_key"))
+        batch_op.create_index(batch_op.f("ix_jobs_key"), ["key"], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table("jobs", schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f("ix_jobs_key"))
+        batch_op.create_index(batch_op.f("ix_jobs_key"), ["key"], unique=False)
@@ -0,0 +1,28 @@
+"""Added updated_at to users
+
+Revision ID: f1b8d3e6a2c4
+Revises: e4a7c2d9b816
+Create Date: 2026-10-18 19:12:36.204518
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "f1b8d3e6a2c4"
+down_revision = "e4a7c2d9b816"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("users", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("updated_at", sa.DateTime(), nullable=True))
+
+    op.execute("UPDATE users SET updated_at = CURRENT_TIMESTAMP")
+
+
+def downgrade():
+    with op.batch_alter_table("users", schema=None) as batch_op:
+        batch_op.drop_column("updated_at")
@@ -0,0 +1,63 @@
+"""Added full-text search
+
+Revision ID: f6d4a1846f45
+Revises: 0a54b451bc7d
+Create Date: 2026-10-18 12:21:05.530871
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "f6d4a1846f45"
+down_revision = "0a54b451bc7d"
+branch_labels = None
+depends_on = None
+
+# FTS5 indexes over the searchable columns, kept in sync by triggers so that
+# bulk statements are indexed too. Other databases use the in-process index
+# in resources/search.py instead.
+INDEXES = {
+    "teams": ["name", "stadium", "city"],
+    "players": ["name"],
+}
+
+
+def upgrade():
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    for table, columns in INDEXES.items():
+        names = ", ".join(columns)
+        new = ", ".join(f"new.{column}" for column in columns)
+        old = ", ".join(f"old.{column}" for column in columns)
+        op.execute(
+            f"CREATE VIRTUAL TABLE {table}_fts USING fts5({names}, "
+            f"content='{table}', content_rowid='id', "
+            "tokenize='unicode61 remove_diacritics 2')"
+        )
+        op.execute(
+            f"CREATE TRIGGER {table}_fts_insert AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {table}_fts(rowid, {names}) VALUES (new.id, {new}); END"
+        )
+        op.execute(
+            f"CREATE TRIGGER {table}_fts_delete AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {table}_fts({table}_fts, rowid, {names}) "
+            f"VALUES ('delete', old.id, {old}); END"
+        )
+        op.execute(
+            f"CREATE TRIGGER {table}_fts_update AFTER UPDATE ON {table} BEGIN "
+            f"INSERT INTO {table}_fts({table}_fts, rowid, {names}) "
+            f"VALUES ('delete', old.id, {old}); "
+            f"INSERT INTO {table}_fts(rowid, {names}) VALUES (new.id, {new}); END"
+        )
+        op.execute(f"INSERT INTO {table}_fts({table}_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    for table in INDEXES:
+        for event in ("insert", "delete", "update"):
+            op.execute(f"DROP TRIGGER IF EXISTS {table}_fts_{event}")
+        op.execute(f"DROP TABLE IF EXISTS {table}_fts")
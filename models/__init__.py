@@ -5,3 +5,5 @@ from .team import TeamsModel
 from .team import TeamPlayersModel
 from .user import UserModel
 from .blocklist import BlocklistModel
+from .stats import TeamStatsModel
+from .job import JobModel
@@ -0,0 +1,21 @@
+from resources.db import db, ReprMixin
+
+
+class JobModel(ReprMixin, db.Model):
+    __tablename__ = "jobs"
+    __table_args__ = (
+        db.Index("ix_jobs_status_available_at", "status", "available_at"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String, nullable=False)
+    key = db.Column(db.String, index=True, unique=True)
+    payload = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String, nullable=False)
+    attempts = db.Column(db.Integer, nullable=False)
+    # when the job may next be claimed: once queued, after a failed attempt,
+    # or when the worker running it is presumed dead
+    available_at = db.Column(db.DateTime, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)
+    finished_at = db.Column(db.DateTime)
+    error = db.Column(db.Text)
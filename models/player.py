@@ -1,10 +1,9 @@
-from resources.db import db
-import json
-from resources.schemas import serialize
+from resources.db import db, utcnow, ReprMixin
 
 
-class PlayersModel(db.Model):
+class PlayersModel(ReprMixin, db.Model):
     __tablename__ = "players"
+    __table_args__ = (db.Index("ix_players_team_id_position", "team_id", "position"),)
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String, nullable=False)
@@ -12,19 +11,17 @@ class PlayersModel(db.Model):
     position = db.Column(db.String)
     team_id = db.Column(db.Integer, db.ForeignKey("teams.id"))
     portrait = db.Column(db.String)
-
-    def __str__(self):
-        return json.dumps(
-            {
-                "id": self.id,
-                "name": self.name,
-                "birth_date": self.birth_date,
-                "position": self.position,
-                "team_id": self.team_id,
-                "portrait": self.portrait,
-            },
-            default=serialize,
-        )
+    updated_at = db.Column(db.DateTime, default=utcnow, onupdate=utcnow)
+    # bumped by every UPDATE, for the compare-and-swap of resources/conditional.py
+    version = db.Column(
+        db.Integer,
+        nullable=False,
+        default=1,
+        server_default="1",
+        onupdate=db.literal_column("version + 1"),
+    )
+    # lets the multi-row INSERT of /player/batch return ids in row order
+    sentinel = db.insert_sentinel("sentinel")
 
 
 class PlayerModel(PlayersModel):
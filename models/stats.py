@@ -0,0 +1,16 @@
+from resources.db import db
+
+
+class TeamStatsModel(db.Model):
+    """Per team and position counters of the players, kept up to date by
+    database triggers (see resources/stats.py)."""
+
+    __tablename__ = "team_stats"
+
+    team_id = db.Column(db.Integer, primary_key=True)
+    # players without a position are counted under ""
+    position = db.Column(db.String, primary_key=True)
+    players = db.Column(db.Integer, nullable=False)
+    birth_dates = db.Column(db.Integer, nullable=False)
+    # sum of the birth dates, in days since 1970-01-01
+    birth_date_days = db.Column(db.Float, nullable=False)
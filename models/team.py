@@ -1,9 +1,7 @@
-from resources.db import db
-import json
-from resources.schemas import serialize
+from resources.db import db, utcnow, ReprMixin
 
 
-class TeamsModel(db.Model):
+class TeamsModel(ReprMixin, db.Model):
     __tablename__ = "teams"
 
     id = db.Column(db.Integer, primary_key=True)
@@ -13,28 +11,31 @@ class TeamsModel(db.Model):
     state = db.Column(db.String)
     stadium = db.Column(db.String)
     logo = db.Column(db.String)
-    owner_id = db.Column(db.Integer, db.ForeignKey("users.id"))
-
-    def __str__(self):
-        return json.dumps(
-            {
-                "id": self.id,
-                "name": self.name,
-                "stadium": self.stadium,
-                "city": self.city,
-                "state": self.state,
-                "foundation_date": self.foundation_date,
-                "logo": self.logo,
-                "owner_id": self.owner_id,
-            },
-            default=serialize,
-        )
+    owner_id = db.Column(db.Integer, db.ForeignKey("users.id"), index=True)
+    updated_at = db.Column(db.DateTime, default=utcnow, onupdate=utcnow)
+    # bumped by every UPDATE, for the compare-and-swap of resources/conditional.py
+    version = db.Column(
+        db.Integer,
+        nullable=False,
+        default=1,
+        server_default="1",
+        onupdate=db.literal_column("version + 1"),
+    )
 
 
 class TeamModel(TeamsModel):
-    players = db.relationship("PlayerModel", back_populates="team", lazy="dynamic")
+    # players are detached from a deleted team by one UPDATE, see resources/team.py
+    players = db.relationship(
+        "PlayerModel",
+        back_populates="team",
+        lazy="dynamic",
+        order_by="PlayerModel.id",
+        passive_deletes="all",
+    )
     owner = db.relationship("UserModel", back_populates="teams")
 
 
 class TeamPlayersModel(TeamsModel):
-    players = db.relationship("PlayersModel", lazy="dynamic")
+    players = db.relationship(
+        "PlayersModel", lazy="dynamic", order_by="PlayersModel.id"
+    )
@@ -1,28 +1,21 @@
-from resources.db import db
-from resources.schemas import serialize
+from resources.db import db, utcnow, ReprMixin
 from flask_login import UserMixin
-import json
 
 
-class UsersModel(UserMixin, db.Model):
+class UsersModel(UserMixin, ReprMixin, db.Model):
     __tablename__ = "users"
+    __repr_hidden__ = ("password",)
 
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String, unique=True, nullable=False)
     email = db.Column(db.String, unique=True, nullable=False)
     password = db.Column(db.String, nullable=False)
-
-    def __str__(self):
-        return json.dumps(
-            {
-                "id": self.id,
-                "username": self.username,
-                "email": self.email,
-                "password": self.password,
-            },
-            default=serialize,
-        )
+    # for the version of the table in resources/export.py, as ids are reused
+    updated_at = db.Column(db.DateTime, default=utcnow, onupdate=utcnow)
 
 
 class UserModel(UsersModel):
-    teams = db.relationship("TeamModel", back_populates="owner", lazy="dynamic")
+    # released with one UPDATE by User.delete rather than loaded one by one
+    teams = db.relationship(
+        "TeamModel", back_populates="owner", lazy="dynamic", passive_deletes="all"
+    )
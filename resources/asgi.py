@@ -0,0 +1,234 @@
+import re
+from urllib.parse import parse_qsl, urlencode
+from a2wsgi import WSGIMiddleware
+from marshmallow import ValidationError
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import joinedload
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header, parse_date, parse_etags
+from models import PlayerModel, PlayersModel, TeamsModel
+from .conditional import Version
+from .db import db, init_sqlite
+from .ndjson import NDJSON_MIMETYPE
+from .player import filter_players, player_version_query
+from .schemas import (
+    PlayerBaseSchema,
+    PlayerFilterSchema,
+    PlayerSchema,
+    PlayerUpdateSchema,
+    TeamSchema,
+)
+from .team import team_version_query
+
+# shared so that each one generates its dump function once
+TEAM_SCHEMA = TeamSchema()
+PLAYER_SCHEMA = PlayerSchema()
+PLAYERS_SCHEMA = PlayerSchema(many=True)
+PLAYER_BASE_SCHEMA = PlayerBaseSchema(many=True)
+PLAYER_LIST_SCHEMA = PlayerUpdateSchema(many=True)
+PLAYER_FILTER_SCHEMA = PlayerFilterSchema()
+
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+
+
+def async_database_url(url):
+    url = make_url(url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None:
+        raise ValueError(f"No async driver known for {url.get_backend_name()!r}.")
+    return url.set(drivername=driver)
+
+
+class Request:
+    """The parts of an ASGI ``http`` scope the async handlers look at."""
+
+    def __init__(self, scope):
+        self.path = scope["path"]
+        self.query_string = scope["query_string"]
+        self.headers = {
+            name.decode("latin-1"): value.decode("latin-1")
+            for name, value in scope["headers"]
+        }
+        self.args = {}
+        for name, value in parse_qsl(self.query_string.decode("latin-1")):
+            self.args.setdefault(name, value)
+
+    def preferred(self, *mimetypes):
+        """The first mimetype the client accepts among ``mimetypes``, picked the
+        way flask_accept does."""
+
+        accept = parse_accept_header(self.headers.get("accept"), MIMEAccept)
+        for mimetype in accept.values():
+            if mimetype in mimetypes:
+                return mimetype
+        return None
+
+    def not_modified(self, version):
+        return version.matches(
+            parse_etags(self.headers.get("if-none-match")),
+            parse_date(self.headers.get("if-modified-since")),
+            version.etag("json", self.query_string),
+        )
+
+
+class AsyncAPI:
+    """ASGI application serving the public read-only JSON endpoints as
+    coroutines on an async engine, so requests waiting on the database or on
+    slow clients do not hold a thread.
+
+    Anything else, including those endpoints asked for HTML, with
+    ``?fields=``/``?embed=`` or for a missing row, is passed on to the Flask
+    app, which runs on a pool of ``ASGI_WSGI_WORKERS`` threads.
+    """
+
+    def __init__(self, app):
+        app.config.setdefault("ASGI_WSGI_WORKERS", 10)
+        self.app = app
+        self.wsgi = WSGIMiddleware(app, workers=app.config["ASGI_WSGI_WORKERS"])
+        with app.app_context():
+            url = db.engine.url
+        self.engine = create_async_engine(
+            async_database_url(url), **app.config["SQLALCHEMY_ENGINE_OPTIONS"]
+        )
+        init_sqlite(app, self.engine.sync_engine)
+        self.session = async_sessionmaker(self.engine, expire_on_commit=False)
+        self.routes = [
+            (re.compile(r"/team/(\d+)"), self.team),
+            (re.compile(r"/team/(\d+)/players"), self.team_players),
+            (re.compile(r"/player/"), self.players),
+            (re.compile(r"/player/(\d+)"), self.player),
+        ]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self.lifespan(receive, send)
+        if scope["type"] == "http" and scope["method"] == "GET":
+            for pattern, handler in self.routes:
+                match = pattern.fullmatch(scope["path"])
+                if match is None:
+                    continue
+                request = Request(scope)
+                if "fields" in request.args or "embed" in request.args:
+                    break
+                response = await handler(request, *map(int, match.groups()))
+                if response is not None:
+                    return await self.respond(send, *response)
+                break
+        await self.wsgi(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.engine.dispose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def respond(self, send, data, headers, status=200):
+        if status == 304:
+            response = self.app.response_class(status=304)
+        else:
+            response = self.app.json.response(data)
+        response.headers.update(headers)
+        await send(
+            {
+                "type": "http.response.start",
+                "status": response.status_code,
+                "headers": [
+                    (name.lower().encode("latin-1"), value.encode("latin-1"))
+                    for name, value in response.headers.items()
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": response.get_data()})
+
+    async def version(self, session, query):
+        row = (await session.execute(query)).first()
+        return Version(*row[1:], row_version=row[0]) if row else None
+
+    async def team(self, request, team_id):
+        if request.preferred("application/json") is None:
+            return None
+        async with self.session() as session:
+            version = await self.version(session, team_version_query(team_id))
+            if version is None:
+                return None
+            headers = version.headers("json", request.query_string)
+            if request.not_modified(version):
+                return None, headers, 304
+            team = await session.get(TeamsModel, team_id)
+            players = await session.scalars(
+                select(PlayersModel)
+                .where(PlayersModel.team_id == team_id)
+                .order_by(PlayersModel.id)
+            )
+            data = TEAM_SCHEMA.dump(team)
+            data["players"] = PLAYER_BASE_SCHEMA.dump(players.all())
+        return data, headers
+
+    async def team_players(self, request, team_id):
+        if request.preferred("application/json") is None:
+            return None
+        async with self.session() as session:
+            version = await self.version(session, team_version_query(team_id))
+            if version is None:
+                return None
+            headers = version.headers("json", request.query_string)
+            if request.not_modified(version):
+                return None, headers, 304
+            players = await session.scalars(
+                select(PlayersModel)
+                .where(PlayersModel.team_id == team_id)
+                .order_by(PlayersModel.id)
+            )
+            data = PLAYERS_SCHEMA.dump(players.all())
+        return data, headers
+
+    async def player(self, request, player_id):
+        if request.preferred("application/json") is None:
+            return None
+        async with self.session() as session:
+            version = await self.version(session, player_version_query(player_id))
+            if version is None:
+                return None
+            headers = version.headers("json", request.query_string)
+            if request.not_modified(version):
+                return None, headers, 304
+            player = await session.get(
+                PlayerModel, player_id, options=[joinedload(PlayerModel.team)]
+            )
+            data = PLAYER_SCHEMA.dump(player)
+        return data, headers
+
+    async def players(self, request):
+        mimetype = request.preferred("application/json", NDJSON_MIMETYPE)
+        if mimetype != "application/json":
+            return None
+        try:
+            filters = PLAYER_FILTER_SCHEMA.load(request.args)
+        except ValidationError:
+            return None
+        limit = filters.pop("limit")
+        cursor = filters.pop("cursor", None)
+        query = filter_players(select(PlayersModel), **filters)
+        if cursor is not None:
+            query = query.where(PlayersModel.id > cursor)
+        async with self.session() as session:
+            players = (
+                await session.scalars(query.order_by(PlayersModel.id).limit(limit + 1))
+            ).all()
+        headers = {}
+        if len(players) > limit:
+            players = players[:limit]
+            # the same next page link as next_link() builds for the WSGI app
+            args = {**request.args, "limit": limit, **filters, "cursor": players[-1].id}
+            headers["Link"] = f'<{request.path}?{urlencode(args)}>; rel="next"'
+        return PLAYER_LIST_SCHEMA.dump(players), headers
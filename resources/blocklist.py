@@ -0,0 +1,141 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import delete, select
+from models import BlocklistModel
+from .cache import Cache
+from .db import db
+from .jobs import jobs
+
+# rows committed by other workers may carry a created_at slightly older than
+# the newest row already seen, so every sync re-reads this window
+SYNC_OVERLAP = timedelta(minutes=1)
+
+
+class BlocklistCache:
+    """In-process copy of the revoked JWT ids stored in the ``tokens`` table.
+
+    Lookups are answered from memory; the copy is refreshed incrementally at
+    most every ``JWT_BLOCKLIST_REFRESH`` so revocations made by other workers
+    are picked up, or right away when a shared cache backend reports a newer
+    generation. Revocations older than the longest token lifetime are of
+    expired tokens: every process drops them from its copy at most every
+    ``JWT_BLOCKLIST_PRUNE_INTERVAL``, and a job queued by revocations as
+    often deletes their rows.
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._revoked = {}
+        self._synced_at = None
+        self._checked_at = None
+        self._expired_at = None
+        self._generation = None
+        self._generations = Cache("blocklist", invalidated=True)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("JWT_BLOCKLIST_REFRESH", timedelta(seconds=5))
+        app.config.setdefault("JWT_BLOCKLIST_PRUNE_INTERVAL", timedelta(hours=1))
+        self._generations.init_app(app)
+        app.extensions["blocklist"] = self
+
+    def is_revoked(self, jti):
+        self._sync()
+        return jti in self._revoked
+
+    def revoke(self, *jtis):
+        now = datetime.now()
+        for jti in jtis:
+            db.session.add(BlocklistModel(jti=jti, created_at=now))
+        interval = current_app.config["JWT_BLOCKLIST_PRUNE_INTERVAL"]
+        jobs.enqueue(
+            "prune-blocklist",
+            key=f"prune-blocklist:{int(now.timestamp() // interval.total_seconds())}",
+        )
+        db.session.commit()
+        with self._lock:
+            for jti in jtis:
+                self._revoked[jti] = now
+        self._generations.invalidate()
+
+    def prune(self):
+        lifetime = self._token_lifetime()
+        if lifetime is None:
+            return 0
+        cutoff = datetime.now() - lifetime
+        with db.engine.begin() as connection:
+            result = connection.execute(
+                delete(BlocklistModel).where(BlocklistModel.created_at < cutoff)
+            )
+        with self._lock:
+            self._expire(cutoff)
+        current_app.logger.info(f"Pruned {result.rowcount} revoked tokens.")
+        return result.rowcount
+
+    def _sync(self):
+        now = time.monotonic()
+        refresh = current_app.config["JWT_BLOCKLIST_REFRESH"].total_seconds()
+        generation = self._generations.generation()
+        if self._is_fresh(now, refresh, generation):
+            return
+        with self._lock:
+            if self._is_fresh(now, refresh, generation):
+                return
+            self._checked_at = now
+            self._generation = generation
+            lifetime = self._token_lifetime()
+            cutoff = None if lifetime is None else datetime.now() - lifetime
+            query = select(BlocklistModel.jti, BlocklistModel.created_at)
+            if self._synced_at is not None:
+                query = query.where(
+                    BlocklistModel.created_at >= self._synced_at - SYNC_OVERLAP
+                )
+            if cutoff is not None:
+                query = query.where(BlocklistModel.created_at >= cutoff)
+            with db.engine.connect() as connection:
+                for jti, created_at in connection.execute(query):
+                    self._revoked[jti] = created_at
+                    if self._synced_at is None or created_at > self._synced_at:
+                        self._synced_at = created_at
+            interval = current_app.config["JWT_BLOCKLIST_PRUNE_INTERVAL"]
+            if cutoff is not None and (
+                self._expired_at is None
+                or now - self._expired_at >= interval.total_seconds()
+            ):
+                self._expired_at = now
+                self._expire(cutoff)
+
+    def _expire(self, cutoff):
+        self._revoked = {
+            jti: created_at
+            for jti, created_at in self._revoked.items()
+            if created_at >= cutoff
+        }
+
+    def _is_fresh(self, now, refresh, generation):
+        return (
+            self._checked_at is not None
+            and now - self._checked_at < refresh
+            and generation == self._generation
+        )
+
+    @staticmethod
+    def _token_lifetime():
+        lifetimes = [
+            current_app.config["JWT_ACCESS_TOKEN_EXPIRES"],
+            current_app.config["JWT_REFRESH_TOKEN_EXPIRES"],
+        ]
+        if any(lifetime is False for lifetime in lifetimes):
+            return None
+        return max(lifetimes)
+
+
+blocklist = BlocklistCache()
+
+
+@jobs.task("prune-blocklist")
+def prune_blocklist():
+    blocklist.prune()
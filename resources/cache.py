@@ -0,0 +1,315 @@
+import os
+import pickle
+import socket
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from urllib.parse import urlparse
+from flask import current_app
+
+# process-local half of the single-flight locks, so threads of one worker
+# do not poll the backend for a lock their neighbour holds; the stripes only
+# guard the table of per-key locks, which are dropped once unused
+_stripes = [threading.Lock() for _ in range(64)]
+_key_locks = {}
+
+
+@contextmanager
+def _key_lock(key):
+    stripe = _stripes[hash(key) % len(_stripes)]
+    with stripe:
+        entry = _key_locks.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with stripe:
+            entry[1] -= 1
+            if not entry[1]:
+                del _key_locks[key]
+
+
+class TTLCache:
+    """Thread-safe, size-bounded mapping whose entries expire after ``ttl``
+    seconds. The least recently used entry is evicted when full."""
+
+    # seen by this process only
+    shared = False
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._items = OrderedDict()
+        self._counters = {}
+
+    def get(self, key, default=None):
+        with self._lock:
+            return self._get(key, default)
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._set(key, value, ttl)
+
+    def add(self, key, value, ttl=None):
+        """Sets ``key`` only if it is missing, returning whether it did."""
+
+        with self._lock:
+            if self._get(key) is not None:
+                return False
+            self._set(key, value, ttl)
+            return True
+
+    def incr(self, key):
+        # counters are never evicted, or versioned keys could be reused
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def counter(self, key):
+        return self._counters.get(key, 0)
+
+    def delete(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._counters.clear()
+
+    def _get(self, key, default=None):
+        item = self._items.get(key)
+        if item is None:
+            return default
+        expires, value = item
+        if expires <= time.monotonic():
+            del self._items[key]
+            return default
+        self._items.move_to_end(key)
+        return value
+
+    def _set(self, key, value, ttl):
+        ttl = self.ttl if ttl is None else ttl
+        self._items[key] = (time.monotonic() + ttl, value)
+        self._items.move_to_end(key)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+
+class RESPCache:
+    """Client for a Redis-compatible server, holding one connection per thread.
+
+    The cache is an optimization, so a server that cannot be reached is
+    logged and treated as a miss rather than failing the request.
+    """
+
+    shared = True
+
+    def __init__(self, host="localhost", port=6379, db=0, timeout=1.0):
+        self.address = (host, port)
+        self.db = db
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def get(self, key, default=None):
+        value = self._command("GET", key)
+        return default if value is None else pickle.loads(value)
+
+    def set(self, key, value, ttl=None):
+        if ttl is None:
+            self._command("SET", key, pickle.dumps(value))
+        else:
+            self._command("SET", key, pickle.dumps(value), "PX", int(ttl * 1000))
+
+    def add(self, key, value, ttl=None):
+        args = ["SET", key, pickle.dumps(value), "NX"]
+        if ttl is not None:
+            args += ["PX", int(ttl * 1000)]
+        try:
+            return self._execute(*args) == "OK"
+        except (OSError, EOFError) as e:
+            current_app.logger.warning(f"Cache unavailable: {e}")
+            return True
+
+    def incr(self, key):
+        return self._command("INCR", key)
+
+    def counter(self, key):
+        # counters are kept as plain integers so that INCR works on them
+        return int(self._command("GET", key) or 0)
+
+    def delete(self, key):
+        self._command("DEL", key)
+
+    def clear(self):
+        self._command("FLUSHDB")
+
+    def _command(self, *args):
+        try:
+            return self._execute(*args)
+        except (OSError, EOFError) as e:
+            current_app.logger.warning(f"Cache unavailable: {e}")
+            return None
+
+    def _execute(self, *args):
+        for attempt in (1, 2):
+            connection = self._connection()
+            try:
+                connection.sendall(encode_command(*args))
+                return read_reply(self._local.reader)
+            except (OSError, EOFError):
+                # the server may have closed an idle connection, retry once
+                self._local.connection = None
+                if attempt == 2:
+                    raise
+
+    def _connection(self):
+        if getattr(self._local, "connection", None) is None:
+            connection = socket.create_connection(self.address, self.timeout)
+            self._local.connection = connection
+            self._local.reader = connection.makefile("rb")
+            if self.db:
+                connection.sendall(encode_command("SELECT", self.db))
+                read_reply(self._local.reader)
+        return self._local.connection
+
+
+def encode_command(*args):
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if not isinstance(arg, bytes):
+            arg = str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(parts)
+
+
+def read_reply(reader):
+    line = reader.readline()
+    if not line:
+        raise EOFError("Connection closed by the cache server.")
+    kind, payload = line[:1], line[1:-2]
+    if kind == b"+":
+        return payload.decode()
+    if kind == b"-":
+        raise RuntimeError(payload.decode())
+    if kind == b":":
+        return int(payload)
+    if kind == b"$":
+        length = int(payload)
+        if length < 0:
+            return None
+        data = reader.read(length + 2)
+        return data[:-2]
+    if kind == b"*":
+        length = int(payload)
+        return None if length < 0 else [read_reply(reader) for _ in range(length)]
+    raise RuntimeError(f"Unexpected reply from the cache server: {line!r}")
+
+
+def create_backend(url, maxsize):
+    """``memory://`` for a per-process LRU, ``redis://host:port/db`` for a
+    cache shared by every worker."""
+
+    parsed = urlparse(url)
+    if parsed.scheme == "memory":
+        return TTLCache(maxsize=maxsize)
+    if parsed.scheme == "redis":
+        db = int(parsed.path.strip("/") or 0)
+        return RESPCache(parsed.hostname or "localhost", parsed.port or 6379, db)
+    raise ValueError(f"Unsupported cache URL: {url!r}")
+
+
+class Cache:
+    """A namespace in the application's cache backend.
+
+    Versioned namespaces prefix their keys with a generation counter kept in
+    the backend, so ``invalidate`` drops every entry for all workers at once.
+    That takes a backend shared by the workers, such as ``redis://``: each
+    process has its own ``memory://`` one, where invalidating an entry only
+    reaches the process that does it. Versioned namespaces, and those whose
+    entries are ``invalidated`` by writes, warn about it when not in debug
+    or testing mode.
+    """
+
+    def __init__(self, namespace, versioned=False, ttl=60, invalidated=False):
+        self.namespace = namespace
+        self.versioned = versioned
+        self.invalidated = invalidated or versioned
+        self.ttl = ttl
+        self.backend = TTLCache()
+
+    def init_app(self, app):
+        app.config.setdefault("CACHE_URL", os.getenv("CACHE_URL", "memory://"))
+        app.config.setdefault("CACHE_SIZE", 4096)
+        if "cache" not in app.extensions:
+            app.extensions["cache"] = create_backend(
+                app.config["CACHE_URL"], app.config["CACHE_SIZE"]
+            )
+        self.backend = app.extensions["cache"]
+        if (
+            self.invalidated
+            and not self.backend.shared
+            and not (app.debug or app.testing)
+        ):
+            app.logger.warning(
+                f"The {self.namespace} cache is only invalidated in the process "
+                f"that writes, with CACHE_URL={app.config['CACHE_URL']}; "
+                "use a redis:// URL to run several workers."
+            )
+
+    def generation(self):
+        return self.backend.counter(f"{self.namespace}:generation")
+
+    def invalidate(self):
+        return self.backend.incr(f"{self.namespace}:generation")
+
+    def key(self, key, generation=None):
+        if not self.versioned:
+            return f"{self.namespace}:{key}"
+        if generation is None:
+            generation = self.generation()
+        return f"{self.namespace}:{generation}:{key}"
+
+    def get(self, key, generation=None):
+        return self.backend.get(self.key(key, generation))
+
+    def set(self, key, value, generation=None):
+        self.backend.set(self.key(key, generation), value, self.ttl)
+
+    def delete(self, key):
+        self.backend.delete(self.key(key))
+
+    @contextmanager
+    def lock(self, key, timeout=10):
+        """Single-flight lock: only one holder per key across all workers.
+        Waiters give up after ``timeout`` seconds and proceed anyway."""
+
+        lock_key = f"{self.namespace}:lock:{key}"
+        with _key_lock(lock_key):
+            deadline = time.monotonic() + timeout
+            while not (acquired := self.backend.add(lock_key, 1, timeout)):
+                if time.monotonic() >= deadline:
+                    break
+                time.sleep(0.01)
+            try:
+                yield
+            finally:
+                if acquired:
+                    self.backend.delete(lock_key)
+
+    def get_or_set(self, key, compute):
+        """Returns the cached value, computing it at most once at a time.
+        ``None`` results are not cached."""
+
+        value = self.get(key)
+        if value is None:
+            with self.lock(key):
+                value = self.get(key)
+                if value is None:
+                    value = compute()
+                    if value is not None:
+                        self.set(key, value)
+        return value
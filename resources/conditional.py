@@ -0,0 +1,94 @@
+import hashlib
+from datetime import datetime, timezone
+from flask import Response, request, session
+from flask_login import current_user
+from werkzeug.http import http_date
+
+
+class Version:
+    """HTTP validators of a resource, derived from the timestamps and counts
+    of the rows it is rendered from.
+
+    The HTML pages also depend on who is looking at them, so the viewer is
+    part of their ETag and pages carrying flashed messages are never 304'd.
+    The query string is part of every ETag, as ``?fields=`` and ``?embed=``
+    change the body. The ETag of a single team or player starts with the
+    ``version`` of its row, which is what ``If-Match`` is checked against.
+
+    Versions that count rows, those of collections, have no
+    ``Last-Modified``: deleting one of their rows changes the count but not
+    the latest timestamp, so only their ETag tells them apart.
+    """
+
+    def __init__(self, *parts, row_version=None):
+        self.parts = parts
+        self.row_version = row_version
+        timestamps = [part for part in parts if isinstance(part, datetime)]
+        counted = any(isinstance(part, int) for part in parts)
+        self.last_modified = (
+            max(timestamps).replace(tzinfo=timezone.utc)
+            if timestamps and not counted
+            else None
+        )
+
+    def etag(self, representation, query_string=None):
+        if query_string is None:
+            query_string = request.query_string
+        parts = (representation, query_string) + self.parts
+        if representation == "html":
+            parts += (current_user.get_id(),)
+        digest = hashlib.sha1(repr(parts).encode()).hexdigest()
+        if self.row_version is not None:
+            return f"{self.row_version}-{digest}"
+        return digest
+
+    def headers(self, representation, query_string=None):
+        headers = {
+            "ETag": f'"{self.etag(representation, query_string)}"',
+            "Vary": "Accept, Cookie" if representation == "html" else "Accept",
+        }
+        if self.last_modified:
+            headers["Last-Modified"] = http_date(self.last_modified)
+        return headers
+
+    def not_modified(self, representation):
+        """Returns a 304 response if the request's validators still match."""
+
+        if representation == "html" and session.get("_flashes"):
+            return None
+        if not self.matches(
+            request.if_none_match,
+            request.if_modified_since,
+            self.etag(representation),
+        ):
+            return None
+        return Response(status=304, headers=self.headers(representation))
+
+    def matches(self, if_none_match, if_modified_since, etag):
+        """Whether a client sending these validators has this version."""
+
+        if if_none_match:
+            return if_none_match.contains(etag)
+        if if_modified_since and self.last_modified:
+            return self.last_modified.replace(microsecond=0) <= if_modified_since
+        return False
+
+
+def if_match_versions():
+    """Row versions the request's ``If-Match`` header allows an update of, or
+    ``None`` if it does not have one or has ``*``.
+
+    Its entity-tags are ETags of the resource, or just the ``version`` it was
+    read at, as in ``If-Match: "3"``; only that version is compared, so
+    changes to the players listed by a team do not fail an update of it.
+    """
+
+    if_match = request.if_match
+    if not if_match or if_match.star_tag:
+        return None
+    versions = set()
+    for etag in if_match:
+        version = etag.partition("-")[0]
+        if version.isdigit():
+            versions.add(int(version))
+    return versions
@@ -1,5 +1,7 @@
+import os
+from datetime import datetime, timezone
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import MetaData
+from sqlalchemy import MetaData, event, inspect
 
 convention = {
     "ix": "ix_%(column_0_label)s",
@@ -11,3 +13,69 @@ convention = {
 
 metadata = MetaData(naming_convention=convention)
 db = SQLAlchemy(metadata=metadata)
+
+
+class ReprMixin:
+    """``repr`` listing the columns already loaded. It never hits the
+    database, and logging calls pass models as arguments, so nothing is
+    built unless the record is emitted."""
+
+    __repr_hidden__ = ()
+
+    def __repr__(self):
+        state = inspect(self)
+        values = state.dict
+        columns = [
+            f"{attribute.key}={values[attribute.key]!r}"
+            for attribute in state.mapper.column_attrs
+            if attribute.key in values and attribute.key not in self.__repr_hidden__
+        ]
+        if "id" not in values and state.identity:
+            columns.insert(0, f"id={state.identity[0]!r}")
+        return f"{type(self).__name__}({', '.join(columns)})"
+
+
+def utcnow():
+    """Naive UTC timestamp, as stored in the ``updated_at`` columns."""
+
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def configure_database(app):
+    """Reads the database settings from the environment."""
+
+    uri = os.getenv("DATABASE_URL", "sqlite:///data.db")
+    options = {
+        "pool_pre_ping": os.getenv("DATABASE_POOL_PRE_PING", "1") == "1",
+        "pool_recycle": int(os.getenv("DATABASE_POOL_RECYCLE", 1800)),
+    }
+    if not uri.startswith("sqlite"):
+        options["pool_size"] = int(os.getenv("DATABASE_POOL_SIZE", 5))
+        options["max_overflow"] = int(os.getenv("DATABASE_MAX_OVERFLOW", 10))
+    app.config["SQLALCHEMY_DATABASE_URI"] = uri
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = options
+    app.config["SQLITE_BUSY_TIMEOUT"] = int(os.getenv("SQLITE_BUSY_TIMEOUT", 5000))
+    app.config["SQLITE_CACHE_SIZE"] = int(os.getenv("SQLITE_CACHE_SIZE", 65536))
+
+
+def init_sqlite(app, engine=None):
+    """Sets WAL mode and the connection pragmas on every new SQLite connection,
+    so that readers in other workers are not blocked by a writer."""
+
+    if engine is None:
+        with app.app_context():
+            engine = db.engine
+    if engine.dialect.name != "sqlite":
+        return
+    busy_timeout = app.config["SQLITE_BUSY_TIMEOUT"]
+    cache_size = app.config["SQLITE_CACHE_SIZE"]
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={busy_timeout:d}")
+        # negative values are in KiB rather than pages
+        cursor.execute(f"PRAGMA cache_size={-cache_size:d}")
+        cursor.close()
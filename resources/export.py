@@ -0,0 +1,175 @@
+import csv
+import glob
+import os
+import threading
+from flask import current_app as app, send_file
+from flask_jwt_extended import jwt_required
+from flask_smorest import Blueprint, abort
+from flask.views import MethodView
+from sqlalchemy import Date, DateTime, Float, Integer, func, select
+from models import PlayersModel, TeamsModel
+from models.user import UsersModel
+from .conditional import Version
+from .db import db
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # in requirements.txt; without it snapshots are CSV only
+    pyarrow = None
+
+blp = Blueprint("export", __name__, description="Snapshots of the tables.")
+
+TABLES = {
+    "teams": TeamsModel,
+    "players": PlayersModel,
+    "users": UsersModel,
+}
+HIDDEN_COLUMNS = {"users": {"password"}, "players": {"sentinel"}}
+MIMETYPES = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+
+
+def columns(table):
+    model = TABLES[table]
+    hidden = HIDDEN_COLUMNS.get(table, ())
+    return [column for column in model.__table__.columns if column.key not in hidden]
+
+
+def table_version(table):
+    """Version of a table, which changes with every insert, update and delete
+    of its rows, as far as they keep ``updated_at`` up to date."""
+
+    model = TABLES[table]
+    parts = [func.count(model.id), func.max(model.id)]
+    if "updated_at" in model.__table__.columns:
+        parts.append(func.max(model.updated_at))
+    return Version(*db.session.execute(select(*parts)).one())
+
+
+class ExportStore:
+    """Snapshots of whole tables as CSV and, with pyarrow installed, Parquet
+    files under ``STORAGE_DIR/exports``.
+
+    A snapshot is named after the version of its table, so it is written
+    once per change of the data, by whoever asks for it first, and then
+    served from disk. Rows are read and written ``EXPORT_BATCH_SIZE`` at a
+    time, so memory does not grow with the table.
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._locks = {}
+        self.directory = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("STORAGE_DIR", os.path.join(app.root_path, "storage"))
+        app.config.setdefault("EXPORT_BATCH_SIZE", 5000)
+        self.directory = os.path.join(app.config["STORAGE_DIR"], "exports")
+        os.makedirs(self.directory, exist_ok=True)
+        app.extensions["exports"] = self
+
+    def snapshot(self, table, format):
+        """Path of the current ``format`` snapshot of ``table``, written if
+        missing."""
+
+        digest = table_version(table).etag(format, b"")
+        path = os.path.join(self.directory, f"{table}-{digest}.{format}")
+        if os.path.exists(path):
+            return path
+        with self._lock_for(path):
+            if not os.path.exists(path):
+                app.logger.info(f"Writing the {format} snapshot of {table}...")
+                temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                try:
+                    WRITERS[format](table, temporary)
+                    os.replace(temporary, path)
+                finally:
+                    if os.path.exists(temporary):
+                        os.remove(temporary)
+                self._remove_older(table, format, path)
+        return path
+
+    def _lock_for(self, path):
+        with self._lock:
+            return self._locks.setdefault(path, threading.Lock())
+
+    def _remove_older(self, table, format, path):
+        for older in glob.glob(os.path.join(self.directory, f"{table}-*.{format}")):
+            if older != path:
+                try:
+                    os.remove(older)
+                except OSError:
+                    # may still be sent by another worker
+                    pass
+
+
+def batches(table):
+    query = select(*columns(table)).order_by(TABLES[table].id)
+    size = app.config["EXPORT_BATCH_SIZE"]
+    result = db.session.execute(query.execution_options(yield_per=size))
+    yield from result.partitions()
+
+
+def write_csv(table, path):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow([column.key for column in columns(table)])
+        for rows in batches(table):
+            writer.writerows(rows)
+
+
+def arrow_type(column):
+    if isinstance(column.type, Integer):
+        return pyarrow.int64()
+    if isinstance(column.type, Float):
+        return pyarrow.float64()
+    if isinstance(column.type, DateTime):
+        return pyarrow.timestamp("us")
+    if isinstance(column.type, Date):
+        return pyarrow.date32()
+    return pyarrow.string()
+
+
+def write_parquet(table, path):
+    schema = pyarrow.schema(
+        [(column.key, arrow_type(column)) for column in columns(table)]
+    )
+    with pyarrow.parquet.ParquetWriter(path, schema, compression="zstd") as writer:
+        for rows in batches(table):
+            values = list(zip(*rows))
+            writer.write_batch(
+                pyarrow.record_batch(
+                    [
+                        pyarrow.array(column, type=field.type)
+                        for column, field in zip(values, schema)
+                    ],
+                    schema=schema,
+                )
+            )
+
+
+WRITERS = {"csv": write_csv, "parquet": write_parquet}
+FORMATS = [format for format in WRITERS if format == "csv" or pyarrow is not None]
+
+
+exports = ExportStore()
+
+
+@blp.route("/export/<any(teams, players, users):table>.<any(csv, parquet):format>")
+class Export(MethodView):
+    @jwt_required()
+    def get(self, table, format):
+        if format not in FORMATS:
+            abort(501, message="Parquet snapshots need pyarrow to be installed.")
+        path = exports.snapshot(table, format)
+        return send_file(
+            path,
+            mimetype=MIMETYPES[format],
+            as_attachment=True,
+            download_name=f"{table}.{format}",
+            conditional=True,
+            # named after the data version, so the same in every worker
+            etag=os.path.splitext(os.path.basename(path))[0],
+        )
@@ -0,0 +1,37 @@
+from flask_login import UserMixin
+from sqlalchemy import select
+from models import UserModel
+from .cache import Cache
+from .db import db
+
+
+class UserIdentity(UserMixin):
+    """Password-less view of a user, as returned by the session and JWT loaders."""
+
+    def __init__(self, id, username, email):
+        self.id = id
+        self.username = username
+        self.email = email
+
+
+class IdentityCache(Cache):
+    def init_app(self, app):
+        app.config.setdefault("USER_CACHE_TTL", 60)
+        super().init_app(app)
+        self.ttl = app.config["USER_CACHE_TTL"]
+        app.extensions["identities"] = self
+
+    def load(self, user_id):
+        return self.get_or_set(user_id, lambda: self._query(user_id))
+
+    @staticmethod
+    def _query(user_id):
+        row = db.session.execute(
+            select(UserModel.id, UserModel.username, UserModel.email).where(
+                UserModel.id == user_id
+            )
+        ).first()
+        return UserIdentity(*row) if row else None
+
+
+identities = IdentityCache("identities", invalidated=True)
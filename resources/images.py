@@ -0,0 +1,139 @@
+import hashlib
+import io
+import os
+import re
+import threading
+from flask import send_from_directory, url_for
+from flask_smorest import abort
+from PIL import Image, UnidentifiedImageError
+from .jobs import jobs
+
+FORMATS = {"PNG": "png", "JPEG": "jpg", "GIF": "gif", "WEBP": "webp"}
+ONE_YEAR = 365 * 24 * 60 * 60
+IMAGES_URL = "/images/"
+THUMBNAIL_NAME = re.compile(r"(?P<digest>[0-9a-f]+)-(?P<size>\d+)\.(?P<ext>\w+)")
+
+
+class ImageStore:
+    """Uploaded logos and portraits, stored under ``STORAGE_DIR/images`` with
+    content-hashed names and served from ``/images/`` with far-future cache
+    headers, since a name never changes content.
+
+    Every upload gets a thumbnail of each height in ``THUMBNAIL_SIZES``,
+    made by a job queued with it; one asked for before it is made is made
+    on the spot.
+    """
+
+    def __init__(self, app=None):
+        self.directory = None
+        self.sizes = ()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("STORAGE_DIR", os.path.join(app.root_path, "storage"))
+        app.config.setdefault("THUMBNAIL_SIZES", (32, 312))
+        app.config.setdefault("IMAGE_MAX_BYTES", 5 * 1024 * 1024)
+        app.config.setdefault("IMAGE_MAX_PIXELS", Image.MAX_IMAGE_PIXELS)
+        self.directory = os.path.join(app.config["STORAGE_DIR"], "images")
+        self.sizes = tuple(app.config["THUMBNAIL_SIZES"])
+        self.max_bytes = app.config["IMAGE_MAX_BYTES"]
+        self.max_pixels = app.config["IMAGE_MAX_PIXELS"]
+        os.makedirs(self.directory, exist_ok=True)
+        app.add_url_rule(IMAGES_URL + "<filename>", "images", self.view)
+        app.add_template_filter(thumbnail)
+        app.extensions["images"] = self
+
+    def save(self, file):
+        """Stores the uploaded ``file`` and returns its URL. Its thumbnails are
+        queued in the current session."""
+
+        data = file.stream.read(self.max_bytes + 1)
+        if len(data) > self.max_bytes:
+            abort(413, message=f"Images must be at most {self.max_bytes} bytes.")
+        too_large = f"Images must be at most {self.max_pixels} pixels."
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                image.verify()
+                ext = FORMATS.get(image.format)
+                pixels = image.width * image.height
+        except Image.DecompressionBombError:
+            abort(413, message=too_large)
+        except (UnidentifiedImageError, OSError, SyntaxError):
+            ext = None
+        if ext is None:
+            abort(400, message="The file must be a PNG, JPEG, GIF or WebP image.")
+        # a few compressed bytes can hold enough pixels to exhaust the memory
+        # of whoever makes the thumbnails
+        if pixels > self.max_pixels:
+            abort(413, message=too_large)
+        name = f"{hashlib.sha256(data).hexdigest()[:32]}.{ext}"
+        path = os.path.join(self.directory, name)
+        if not os.path.exists(path):
+            write(path, data)
+        jobs.enqueue("make-thumbnails", key=f"thumbnails:{name}", filename=name)
+        return url_for("images", filename=name)
+
+    def view(self, filename):
+        if not os.path.exists(os.path.join(self.directory, filename)):
+            match = THUMBNAIL_NAME.fullmatch(filename)
+            original = match and f"{match['digest']}.{match['ext']}"
+            if (
+                not match
+                or int(match["size"]) not in self.sizes
+                or not os.path.exists(os.path.join(self.directory, original))
+            ):
+                abort(404)
+            self._make_thumbnail(original, int(match["size"]))
+        response = send_from_directory(self.directory, filename, max_age=ONE_YEAR)
+        response.cache_control.immutable = True
+        return response
+
+    def make_thumbnails(self, name):
+        for size in self.sizes:
+            self._make_thumbnail(name, size)
+
+    def _make_thumbnail(self, name, size):
+        path = os.path.join(self.directory, thumbnail_name(name, size))
+        if os.path.exists(path):
+            return
+        with Image.open(os.path.join(self.directory, name)) as image:
+            format = image.format
+            if image.mode not in ("RGB", "RGBA", "L", "LA"):
+                image = image.convert("RGB" if format == "JPEG" else "RGBA")
+            if image.height > size:
+                width = max(round(image.width * size / image.height), 1)
+                image = image.resize((width, size), Image.LANCZOS)
+            buffer = io.BytesIO()
+            image.save(buffer, format=format)
+        write(path, buffer.getvalue())
+
+
+def write(path, data):
+    # written aside and renamed so that no one serves a partial file
+    temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(data)
+    os.replace(temporary, path)
+
+
+def thumbnail_name(name, size):
+    stem, ext = os.path.splitext(name)
+    return f"{stem}-{size}{ext}"
+
+
+def thumbnail(url, size):
+    """Template filter linking to the ``size`` thumbnail of a stored image,
+    leaving other URLs as they are."""
+
+    if not url or not url.startswith(IMAGES_URL):
+        return url
+    return IMAGES_URL + thumbnail_name(url[len(IMAGES_URL) :], size)
+
+
+images = ImageStore()
+
+
+@jobs.task("make-thumbnails")
+def make_thumbnails(filename):
+    images.make_thumbnails(filename)
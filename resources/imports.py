@@ -0,0 +1,259 @@
+import csv
+import io
+import json
+import os
+from itertools import islice
+from flask import current_app as app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_smorest import Blueprint, abort
+from flask.views import MethodView
+from marshmallow import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from models import PlayersModel, TeamsModel
+from .db import db
+from .ndjson import NDJSON_MIMETYPE
+from .schemas import TeamBaseSchema, PlayerSchema, ImportSchema, ImportResultSchema
+
+blp = Blueprint("import", __name__, description="Bulk imports of teams and players.")
+
+TABLES = {
+    "teams": (TeamsModel, TeamBaseSchema),
+    "players": (PlayersModel, PlayerSchema),
+}
+EXTENSIONS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+MIMETYPES = {"text/csv": "csv", NDJSON_MIMETYPE: "ndjson"}
+FORBIDDEN = "The team must be owned by you or have no owner."
+
+
+def read_csv(lines):
+    # empty cells are left out, as they would be from a form
+    for row in csv.DictReader(lines):
+        yield {key: value for key, value in row.items() if key and value != ""}
+
+
+def read_ndjson(lines):
+    for line in lines:
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield None
+
+
+READERS = {"csv": read_csv, "ndjson": read_ndjson}
+
+
+def guess_format(filename, mimetype=None):
+    """Format of a file named ``filename``, by its extension or else its
+    ``mimetype``, or ``None``."""
+
+    extension = os.path.splitext(filename or "")[1].lower()
+    return EXTENSIONS.get(extension) or MIMETYPES.get(mimetype)
+
+
+def describe(messages):
+    return "; ".join(
+        f"{key}: {' '.join(map(str, value)) if isinstance(value, list) else value}"
+        for key, value in messages.items()
+    )
+
+
+class Importer:
+    """Bulk loads of teams and players from CSV or NDJSON files.
+
+    Files are read as a stream, ``IMPORT_BATCH_SIZE`` rows at a time. Each
+    batch is validated by the schema of the table, inserted with a single
+    executemany and committed, so an import that stops halfway keeps the
+    batches before. Rows are checked against one map of the existing teams,
+    read once per import, with which players name their team. Rejected rows
+    are reported with their index, up to ``IMPORT_MAX_ERRORS`` of them.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("IMPORT_BATCH_SIZE", 5000)
+        app.config.setdefault("IMPORT_MAX_ERRORS", 1000)
+        app.extensions["imports"] = self
+
+    def load(self, table, lines, format, owner_id=None):
+        """Imports the rows of ``table`` read from the text stream ``lines``.
+
+        Teams are given to ``owner_id``, and players may only join its teams
+        or teams without an owner; with no owner (from the command line)
+        teams are left without one and any team may be joined.
+        """
+
+        return Import(table, owner_id).run(READERS[format](lines))
+
+
+class Import:
+    def __init__(self, table, owner_id):
+        self.model, schema = TABLES[table]
+        self.schema = schema(many=True)
+        self.owner_id = owner_id
+        self.batch_size = app.config["IMPORT_BATCH_SIZE"]
+        self.max_errors = app.config["IMPORT_MAX_ERRORS"]
+        self.report = {"created": 0, "failed": 0, "errors": []}
+        self.team_ids, self.team_owners = {}, {}
+        for team_id, name, owner_id in db.session.execute(
+            select(TeamsModel.id, TeamsModel.name, TeamsModel.owner_id)
+        ):
+            self.team_ids[name] = team_id
+            self.team_owners[team_id] = owner_id
+
+    def run(self, rows):
+        app.logger.info(f"Importing {self.model.__tablename__}...")
+        rows = enumerate(rows)
+        index = 0
+        while True:
+            try:
+                batch = list(islice(rows, self.batch_size))
+            except (csv.Error, UnicodeDecodeError) as e:
+                self.fail(index, 400, f"The file could not be read: {e}")
+                break
+            if not batch:
+                break
+            index = batch[-1][0] + 1
+            if self.model is TeamsModel:
+                self.insert_teams(self.validate(batch))
+            else:
+                self.insert_players(self.validate(batch))
+        app.logger.info(
+            f"Imported {self.report['created']} {self.model.__tablename__}, "
+            f"rejected {self.report['failed']}."
+        )
+        return self.report
+
+    def fail(self, index, status, message):
+        self.report["failed"] += 1
+        if len(self.report["errors"]) < self.max_errors:
+            self.report["errors"].append(
+                {"index": index, "status": status, "message": message}
+            )
+
+    def validate(self, batch):
+        """(index, team name, data) of the valid rows of ``batch``."""
+
+        rows, names, indexes = [], [], []
+        for index, row in batch:
+            if not isinstance(row, dict):
+                self.fail(index, 400, "Each row must be a JSON object.")
+                continue
+            if self.model is PlayersModel:
+                names.append(row.pop("team", None))
+            else:
+                names.append(None)
+            rows.append(row)
+            indexes.append(index)
+        try:
+            data, errors = self.schema.load(rows), {}
+        except ValidationError as e:
+            data, errors = e.valid_data, e.messages
+        for position, (index, name, info) in enumerate(zip(indexes, names, data)):
+            if position in errors:
+                self.fail(index, 422, describe(errors[position]))
+            else:
+                yield index, name, info
+
+    def insert_teams(self, valid):
+        indexes, rows = [], []
+        for index, _, info in valid:
+            if info["name"] in self.team_ids:
+                self.fail(index, 409, "Team already exists!")
+                continue
+            # claimed so that a repeated name in the file is rejected too
+            self.team_ids[info["name"]] = None
+            indexes.append(index)
+            rows.append(
+                {
+                    "name": info["name"],
+                    "foundation_date": info.get("foundation_date"),
+                    "stadium": info.get("stadium"),
+                    "city": info.get("city"),
+                    "state": info.get("state"),
+                    "logo": info.get("logo"),
+                    "owner_id": self.owner_id,
+                }
+            )
+        table = TeamsModel.__table__
+        created = self.insert(
+            indexes, rows, insert(table).returning(table.c.id, table.c.name)
+        )
+        for team_id, name in created or ():
+            self.team_ids[name] = team_id
+            self.team_owners[team_id] = self.owner_id
+        if created is None:
+            for row in rows:
+                del self.team_ids[row["name"]]
+
+    def insert_players(self, valid):
+        indexes, rows = [], []
+        for index, name, info in valid:
+            team_id = info.get("team_id")
+            if name is not None:
+                if self.team_ids.get(name) is None:
+                    self.fail(index, 404, f"Team {name!r} not found.")
+                    continue
+                if team_id is not None and team_id != self.team_ids[name]:
+                    self.fail(index, 400, f"Team {name!r} does not have that id.")
+                    continue
+                team_id = self.team_ids[name]
+            if team_id is not None:
+                if team_id not in self.team_owners:
+                    self.fail(index, 404, f"Team {team_id} not found.")
+                    continue
+                owner_id = self.team_owners[team_id]
+                if self.owner_id is not None and owner_id not in (None, self.owner_id):
+                    self.fail(index, 403, FORBIDDEN)
+                    continue
+            indexes.append(index)
+            rows.append(
+                {
+                    "name": info["name"],
+                    "position": info.get("position"),
+                    "birth_date": info.get("birth_date"),
+                    "team_id": team_id,
+                    "portrait": info.get("portrait"),
+                }
+            )
+        self.insert(indexes, rows, insert(PlayersModel.__table__))
+
+    def insert(self, indexes, rows, statement):
+        """Inserts ``rows`` in one transaction. Returns the rows returned by
+        ``statement``, or ``None`` if the batch was rejected."""
+
+        if not rows:
+            return []
+        try:
+            result = db.session.execute(statement, rows)
+            returned = result.all() if result.returns_rows else []
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            app.logger.error(e)
+            for index in indexes:
+                self.fail(index, 500, "The batch could not be inserted.")
+            return None
+        self.report["created"] += len(rows)
+        return returned
+
+
+importer = Importer()
+
+
+@blp.route("/import/<any(teams, players):table>")
+class BulkImport(MethodView):
+    @jwt_required()
+    @blp.arguments(ImportSchema, location="files")
+    @blp.response(200, ImportResultSchema)
+    def post(self, files, table):
+        file = files["file"]
+        format = guess_format(file.filename, file.mimetype)
+        if format is None:
+            abort(415, message="The file must be a .csv or .ndjson file.")
+        lines = io.TextIOWrapper(file.stream, encoding="utf-8-sig", newline="")
+        return importer.load(table, lines, format, owner_id=get_jwt_identity())
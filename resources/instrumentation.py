@@ -0,0 +1,250 @@
+import cProfile
+import hmac
+import io
+import os
+import pstats
+import random
+import threading
+import time
+from bisect import bisect_left
+from flask import current_app as app
+from flask import Response, g, has_app_context, request
+from flask import before_render_template, template_rendered
+from sqlalchemy import event
+from .db import db
+
+PROMETHEUS_MIMETYPE = "text/plain; version=0.0.4; charset=utf-8"
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRICS = {
+    "teamz_http_requests_total": ("counter", "Requests served."),
+    "teamz_http_request_duration_seconds": ("histogram", "Time to build responses."),
+    "teamz_db_queries_total": ("counter", "SQL statements run by requests."),
+    "teamz_db_query_duration_seconds_total": ("counter", "Time spent in SQL."),
+    "teamz_db_slow_queries_total": ("counter", "Statements over SLOW_QUERY_MS."),
+    "teamz_template_render_seconds_total": ("counter", "Time spent in templates."),
+    "teamz_profiled_requests_total": ("counter", "Requests run under cProfile."),
+}
+
+
+class Metrics:
+    """Prometheus counters and histograms of this process.
+
+    Every worker keeps its own, so with several workers each scrape only
+    sees the one that answered it; scrape them one by one or run one worker
+    per port to get them all.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            buckets, total, count = self._histograms.get(
+                key, ([0] * len(DURATION_BUCKETS), 0.0, 0)
+            )
+            index = bisect_left(DURATION_BUCKETS, value)
+            if index < len(buckets):
+                buckets[index] += 1
+            self._histograms[key] = (buckets, total + value, count + 1)
+
+    def render(self):
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {
+                key: (list(buckets), total, count)
+                for key, (buckets, total, count) in self._histograms.items()
+            }
+        lines = []
+        for name, (type_, description) in METRICS.items():
+            lines += [f"# HELP {name} {description}", f"# TYPE {name} {type_}"]
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{format_labels(labels)} {value}")
+            for (metric, labels), (buckets, total, count) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, observed in zip(DURATION_BUCKETS, buckets):
+                    cumulative += observed
+                    bucket_labels = format_labels(labels + (("le", bound),))
+                    lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+                bucket_labels = format_labels(labels + (("le", "+Inf"),))
+                lines.append(f"{name}_bucket{bucket_labels} {count}")
+                lines.append(f"{name}_sum{format_labels(labels)} {total}")
+                lines.append(f"{name}_count{format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels) + "}"
+
+
+class Instrumentation:
+    """Opt-in request instrumentation, enabled by ``INSTRUMENTATION=1``.
+
+    Every response gets a ``Server-Timing`` header with the total time, the
+    SQL statements run and their time, and the template render time, which
+    are also counted in the Prometheus metrics served at ``/metrics``.
+    Statements slower than ``SLOW_QUERY_MS`` are logged. Requests carrying
+    the ``PROFILE_HEADER`` header set to ``PROFILE_SECRET``, or to anything
+    in debug mode, and a ``PROFILE_SAMPLE_RATE`` fraction of the others, run
+    under cProfile; their hottest functions are logged at DEBUG and, with
+    ``PROFILE_DIR`` set, the full profile is saved there.
+    """
+
+    def __init__(self, app=None):
+        self.metrics = Metrics()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault(
+            "INSTRUMENTATION", os.getenv("INSTRUMENTATION", "0") == "1"
+        )
+        app.config.setdefault("SLOW_QUERY_MS", int(os.getenv("SLOW_QUERY_MS", 100)))
+        app.config.setdefault("PROFILE_HEADER", "X-Profile")
+        app.config.setdefault("PROFILE_SECRET", os.getenv("PROFILE_SECRET"))
+        app.config.setdefault(
+            "PROFILE_SAMPLE_RATE", float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+        )
+        app.config.setdefault("PROFILE_DIR", os.getenv("PROFILE_DIR"))
+        app.config.setdefault("PROFILE_LIMIT", 30)
+        if not app.config["INSTRUMENTATION"]:
+            return
+        app.extensions["instrumentation"] = self
+        with app.app_context():
+            engine = db.engine
+        slow_query = app.config["SLOW_QUERY_MS"] / 1000
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def start_query(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def end_query(conn, cursor, statement, parameters, context, executemany):
+            elapsed = time.perf_counter() - conn.info["query_start"].pop()
+            timings = g.get("timings") if has_app_context() else None
+            endpoint = timings["endpoint"] if timings is not None else "none"
+            if timings is not None:
+                timings["queries"] += 1
+                timings["db"] += elapsed
+            if elapsed >= slow_query:
+                self.metrics.inc("teamz_db_slow_queries_total", endpoint=endpoint)
+                app.logger.warning(
+                    f"Slow query in {endpoint} ({elapsed * 1000:.1f} ms): {statement}"
+                )
+
+        before_render_template.connect(self._start_render, app)
+        template_rendered.connect(self._end_render, app)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        app.add_url_rule("/metrics", "metrics", self.metrics_view)
+
+    def metrics_view(self):
+        return Response(self.metrics.render(), mimetype=PROMETHEUS_MIMETYPE)
+
+    def _before_request(self):
+        g.timings = {
+            "start": time.perf_counter(),
+            "queries": 0,
+            "db": 0.0,
+            "render": 0.0,
+            "endpoint": request.endpoint or "none",
+        }
+        config = app.config
+        rate = config["PROFILE_SAMPLE_RATE"]
+        if self._profile_requested() or (rate and random.random() < rate):
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # another profiler is already running in this thread
+                return
+            g.profiler = profiler
+
+    def _profile_requested(self):
+        value = request.headers.get(app.config["PROFILE_HEADER"])
+        if not value:
+            return False
+        if app.debug:
+            return True
+        # anyone could otherwise make the server profile their requests
+        secret = app.config["PROFILE_SECRET"]
+        return bool(secret) and hmac.compare_digest(value.encode(), secret.encode())
+
+    def _after_request(self, response):
+        timings = g.get("timings")
+        if timings is None:
+            return response
+        elapsed = time.perf_counter() - timings["start"]
+        endpoint = timings["endpoint"]
+        response.headers.add(
+            "Server-Timing",
+            f"app;dur={elapsed * 1000:.2f}, "
+            f'db;dur={timings["db"] * 1000:.2f};desc="{timings["queries"]} queries", '
+            f"render;dur={timings['render'] * 1000:.2f}",
+        )
+        metrics = self.metrics
+        metrics.inc(
+            "teamz_http_requests_total",
+            endpoint=endpoint,
+            method=request.method,
+            status=response.status_code,
+        )
+        metrics.observe(
+            "teamz_http_request_duration_seconds", elapsed, endpoint=endpoint
+        )
+        metrics.inc("teamz_db_queries_total", timings["queries"], endpoint=endpoint)
+        metrics.inc(
+            "teamz_db_query_duration_seconds_total", timings["db"], endpoint=endpoint
+        )
+        metrics.inc(
+            "teamz_template_render_seconds_total",
+            timings["render"],
+            endpoint=endpoint,
+        )
+        return response
+
+    def _teardown_request(self, exception=None):
+        profiler = g.pop("profiler", None)
+        if profiler is None:
+            return
+        profiler.disable()
+        endpoint = g.get("timings", {}).get("endpoint", "none")
+        self.metrics.inc("teamz_profiled_requests_total", endpoint=endpoint)
+        stream = io.StringIO()
+        stats = pstats.Stats(profiler, stream=stream).sort_stats("cumulative")
+        stats.print_stats(app.config["PROFILE_LIMIT"])
+        app.logger.debug(
+            f"Profile of {request.method} {request.path}:\n{stream.getvalue()}"
+        )
+        if app.config["PROFILE_DIR"]:
+            path = os.path.join(
+                app.config["PROFILE_DIR"], f"{endpoint}-{time.time_ns()}.prof"
+            )
+            stats.dump_stats(path)
+
+    def _start_render(self, sender, template, context, **extra):
+        timings = g.get("timings")
+        if timings is not None:
+            timings["render_start"] = time.perf_counter()
+
+    def _end_render(self, sender, template, context, **extra):
+        timings = g.get("timings")
+        if timings is not None and "render_start" in timings:
+            timings["render"] += time.perf_counter() - timings.pop("render_start")
+
+
+instrumentation = Instrumentation()
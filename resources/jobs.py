@@ -0,0 +1,260 @@
+import json
+import multiprocessing
+import signal
+import threading
+import time
+from datetime import timedelta
+from sqlalchemy import delete, event, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from models import JobModel
+from .db import db, utcnow
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# inserts that skip a job whose key is taken rather than fail the transaction
+INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+class JobQueue:
+    """Work deferred until after a request, stored in the ``jobs`` table.
+
+    Jobs are inserted in the transaction of the request with
+    :meth:`enqueue`, so they are queued exactly when its write commits. They are run by
+    ``JOB_THREADS`` threads of every app process, woken up by the commit,
+    and by any ``flask worker`` processes, which poll every
+    ``JOB_POLL_INTERVAL`` seconds and must see the same database and
+    storage directory.
+
+    A claimed job is hidden from other workers for
+    ``JOB_VISIBILITY_TIMEOUT``, after which it is run again as if its worker
+    had died. A failed job is retried after ``JOB_RETRY_DELAY``, doubled at
+    every attempt, up to ``JOB_MAX_ATTEMPTS`` attempts, so tasks must be
+    idempotent. A job with an idempotency key is not queued again while
+    another job with that key is kept, which finished ones are for
+    ``JOB_RETENTION``.
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._threads = []
+        self._pruned_at = None
+        self.tasks = {}
+        self.app = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("JOB_THREADS", 1)
+        app.config.setdefault("JOB_POLL_INTERVAL", 1.0)
+        app.config.setdefault("JOB_VISIBILITY_TIMEOUT", timedelta(minutes=5))
+        app.config.setdefault("JOB_RETRY_DELAY", timedelta(seconds=10))
+        app.config.setdefault("JOB_MAX_ATTEMPTS", 5)
+        app.config.setdefault("JOB_RETENTION", timedelta(days=1))
+        self.app = app
+        app.before_request(self._start_threads)
+        event.listen(db.session, "after_commit", self._after_commit)
+        app.extensions["jobs"] = self
+
+    def task(self, name):
+        """Registers the decorated function as the task ``name``, called with
+        the keyword arguments given to :meth:`enqueue`."""
+
+        def decorator(func):
+            self.tasks[name] = func
+            return func
+
+        return decorator
+
+    def enqueue(self, task, key=None, delay=timedelta(0), **payload):
+        """Queues a job running ``task`` in the current transaction, so that
+        it is only queued if it commits. Returns the id of the job, or
+        ``None`` if a job with ``key`` is kept."""
+
+        now = utcnow()
+        values = {
+            "name": task,
+            "key": key,
+            "payload": json.dumps(payload),
+            "status": QUEUED,
+            "attempts": 0,
+            "available_at": now + delay,
+            "created_at": now,
+        }
+        dialect = db.session.get_bind().dialect.name
+        if dialect in INSERTS:
+            # the unique index on the key settles concurrent requests
+            statement = INSERTS[dialect](JobModel).on_conflict_do_nothing(
+                index_elements=[JobModel.key]
+            )
+        elif key is not None and db.session.scalar(
+            select(JobModel.id).where(JobModel.key == key).limit(1)
+        ):
+            return None
+        else:
+            statement = insert(JobModel)
+        job_id = db.session.scalar(statement.values(**values).returning(JobModel.id))
+        if job_id is not None:
+            db.session.info["jobs_enqueued"] = True
+        return job_id
+
+    def run_workers(self, processes=1, burst=False):
+        """Runs jobs in ``processes`` processes until interrupted or, with
+        ``burst``, until none is due."""
+
+        if processes == 1:
+            return self._work_until_signalled(burst)
+        # forked so that children inherit the app; each opens its own connections
+        context = multiprocessing.get_context("fork")
+        children = [
+            context.Process(target=self._work_until_signalled, args=(burst, True))
+            for _ in range(processes)
+        ]
+        for child in children:
+            child.start()
+        try:
+            for child in children:
+                child.join()
+        except KeyboardInterrupt:
+            for child in children:
+                child.terminate()
+                child.join()
+
+    def work(self, stop, burst=False):
+        """Claims and runs due jobs until ``stop`` is set."""
+
+        app = self.app
+        poll = app.config["JOB_POLL_INTERVAL"]
+        while not stop.is_set():
+            try:
+                job = self._claim()
+                if job is not None:
+                    self._run(job)
+                    continue
+                self._prune()
+            except Exception as e:
+                app.logger.error(f"Job worker error: {e}")
+            finally:
+                db.session.remove()
+            if burst:
+                return
+            self._wakeup.wait(poll)
+            self._wakeup.clear()
+
+    def _work_until_signalled(self, burst, forked=False):
+        if forked:
+            db.engine.dispose(close=False)
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+        self.app.logger.info("Running jobs...")
+        try:
+            self.work(stop, burst)
+        except KeyboardInterrupt:
+            pass
+
+    def _claim(self):
+        while True:
+            now = utcnow()
+            candidate = db.session.execute(
+                select(JobModel.id, JobModel.available_at)
+                .where(
+                    JobModel.status.in_((QUEUED, RUNNING)),
+                    JobModel.available_at <= now,
+                    JobModel.name.in_(self.tasks),
+                )
+                .order_by(JobModel.available_at, JobModel.id)
+                .limit(1)
+            ).first()
+            if candidate is None:
+                db.session.rollback()
+                return None
+            # the job is taken by whoever moves its available_at first
+            claimed = db.session.execute(
+                update(JobModel)
+                .where(
+                    JobModel.id == candidate.id,
+                    JobModel.available_at == candidate.available_at,
+                )
+                .values(
+                    status=RUNNING,
+                    attempts=JobModel.attempts + 1,
+                    available_at=now + self.app.config["JOB_VISIBILITY_TIMEOUT"],
+                )
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.session.commit()
+            if claimed:
+                return db.session.get(JobModel, candidate.id)
+
+    def _run(self, job):
+        app = self.app
+        job_id, name, key, attempts = job.id, job.name, job.key, job.attempts
+        app.logger.debug("Running job: %s", job)
+        values = {"status": DONE, "finished_at": utcnow(), "error": None}
+        try:
+            if attempts > app.config["JOB_MAX_ATTEMPTS"]:
+                raise RuntimeError("Timed out too many times.")
+            self.tasks[name](**json.loads(job.payload))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f"Job {job_id} ({name}) failed: {e!r}")
+            values["error"] = repr(e)
+            if attempts < app.config["JOB_MAX_ATTEMPTS"]:
+                delay = app.config["JOB_RETRY_DELAY"] * 2 ** (attempts - 1)
+                values.update(
+                    status=QUEUED, finished_at=None, available_at=utcnow() + delay
+                )
+            else:
+                values["status"] = FAILED
+        # a job that outlived its visibility timeout may be run again by now
+        # and is then left to that run
+        where = (JobModel.id == job_id, JobModel.attempts == attempts)
+        if values["status"] == DONE and key is None:
+            statement = delete(JobModel).where(*where)
+        else:
+            statement = update(JobModel).where(*where).values(**values)
+        db.session.execute(statement.execution_options(synchronize_session=False))
+        db.session.commit()
+
+    def _prune(self):
+        retention = self.app.config["JOB_RETENTION"]
+        now = time.monotonic()
+        if self._pruned_at is not None and now - self._pruned_at < 60:
+            return
+        self._pruned_at = now
+        db.session.execute(
+            delete(JobModel).where(
+                JobModel.status.in_((DONE, FAILED)),
+                JobModel.finished_at < utcnow() - retention,
+            )
+        )
+        db.session.commit()
+
+    def _start_threads(self):
+        # started lazily so that the threads run in the workers gunicorn forks
+        if self._threads or not self.app.config["JOB_THREADS"]:
+            return
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.app.config["JOB_THREADS"]):
+                thread = threading.Thread(
+                    target=self._work_in_thread, name=f"jobs-{i}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def _work_in_thread(self):
+        with self.app.app_context():
+            self.work(threading.Event())
+
+    def _after_commit(self, session):
+        if session.info.pop("jobs_enqueued", False):
+            self._wakeup.set()
+
+
+jobs = JobQueue()
@@ -0,0 +1,20 @@
+import json
+from flask import Response, stream_with_context
+
+NDJSON_MIMETYPE = "application/x-ndjson"
+NDJSON_BATCH_SIZE = 1000
+
+
+def stream_ndjson(query, column, schema, cursor=None):
+    """Stream ``query`` ordered by ``column`` as newline-delimited JSON,
+    fetching and serializing rows one batch at a time. Unlike the paginated
+    listings there is no limit; ``cursor`` only allows resuming an export."""
+
+    if cursor is not None:
+        query = query.filter(column > cursor)
+
+    def generate():
+        for item in query.order_by(column).yield_per(NDJSON_BATCH_SIZE):
+            yield json.dumps(schema.dump(item)) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
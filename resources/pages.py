@@ -0,0 +1,113 @@
+import functools
+from itertools import chain
+from flask import Response, make_response, request, session
+from sqlalchemy import event
+from .cache import Cache
+from .conditional import Version
+from .db import db
+
+WATCHED_TABLES = {"teams", "players"}
+
+
+class PageCache(Cache):
+    """Rendered HTML pages keyed by the ETag of the version of what they
+    show, which covers the URL's query string and the viewer.
+
+    A page of a team or player is keyed by the version of its rows, read
+    from the database, so it is never older than the data it shows and a
+    write only drops the pages showing it. Lists are keyed by a generation
+    per table, as their versions would scan it, bumped by every commit that
+    writes to the table. Each process would keep its own generations in the
+    ``memory://`` backend and miss the writes of the others, so lists are
+    only cached in a shared one.
+    """
+
+    def init_app(self, app):
+        app.config.setdefault("PAGE_CACHE_TTL", 300)
+        super().init_app(app)
+        self.ttl = app.config["PAGE_CACHE_TTL"]
+        app.extensions["pages"] = self
+        event.listen(db.session, "after_flush", _after_flush)
+        event.listen(db.session, "do_orm_execute", _do_orm_execute)
+        event.listen(db.session, "after_commit", _after_commit)
+        event.listen(db.session, "after_rollback", _after_rollback)
+
+    def table_version(self, *tables):
+        """Version of lists of the rows of ``tables``, or ``None`` when the
+        backend is not shared."""
+
+        if not self.backend.shared:
+            return None
+        return Version(
+            *(self.backend.counter(f"{self.namespace}:{table}") for table in tables)
+        )
+
+    def invalidate_tables(self, tables):
+        for table in tables:
+            self.backend.incr(f"{self.namespace}:{table}")
+
+
+def cached_page(version_of):
+    """Serves a rendered page from the cache when possible, under the version
+    ``version_of`` returns for the view's arguments; pages of missing rows,
+    with no version, are always rendered. Pages with flashed messages and
+    non-200 responses are neither served nor stored."""
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if session.get("_flashes"):
+                return view(*args, **kwargs)
+            # read before rendering, so that a page rendered while a write
+            # commits is stored under the old version, where nobody will look
+            version = version_of(**kwargs)
+            if version is None:
+                return view(*args, **kwargs)
+            key = f"{request.path}|{version.etag('html')}"
+            cached = pages.get(key)
+            if cached is None:
+                with pages.lock(key):
+                    cached = pages.get(key)
+                    if cached is None:
+                        response = make_response(view(*args, **kwargs))
+                        if response.status_code == 200 and not session.get("_flashes"):
+                            pages.set(
+                                key, (response.get_data(), list(response.headers))
+                            )
+                        return response
+            body, headers = cached
+            return Response(body, headers=headers).make_conditional(request)
+
+        return wrapper
+
+    return decorator
+
+
+def _stale(session, table):
+    if table in WATCHED_TABLES:
+        session.info.setdefault("pages_stale", set()).add(table)
+
+
+def _after_flush(session, flush_context):
+    for instance in chain(session.new, session.dirty, session.deleted):
+        _stale(session, instance.__table__.name)
+
+
+def _do_orm_execute(orm_execute_state):
+    if (
+        orm_execute_state.is_insert
+        or orm_execute_state.is_update
+        or orm_execute_state.is_delete
+    ):
+        _stale(orm_execute_state.session, orm_execute_state.statement.table.name)
+
+
+def _after_commit(session):
+    pages.invalidate_tables(session.info.pop("pages_stale", ()))
+
+
+def _after_rollback(session):
+    session.info.pop("pages_stale", None)
+
+
+pages = PageCache("pages", invalidated=True)
@@ -0,0 +1,30 @@
+from flask import request, url_for
+
+
+def paginate(query, column, limit, cursor=None):
+    """Keyset pagination: returns up to ``limit`` rows with ``column`` greater
+    than ``cursor`` and the cursor for the next page (``None`` on the last one)."""
+
+    if cursor is not None:
+        query = query.filter(column > cursor)
+    items = query.order_by(column).limit(limit + 1).all()
+    if len(items) > limit:
+        items = items[:limit]
+        return items, getattr(items[-1], column.key)
+    return items, None
+
+
+def next_url(cursor, **args):
+    """URL of the next page, keeping the other query arguments of this one."""
+
+    if cursor is None:
+        return None
+    args = {**request.args.to_dict(), **args, "cursor": cursor}
+    return url_for(request.endpoint, **request.view_args, **args)
+
+
+def next_link(cursor, **args):
+    url = next_url(cursor, **args)
+    if url is None:
+        return {}
+    return {"Link": f'<{url}>; rel="next"'}
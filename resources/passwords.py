@@ -0,0 +1,89 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from flask_smorest import abort
+from passlib.hash import pbkdf2_sha256
+
+
+def _hash(password, rounds):
+    return pbkdf2_sha256.using(rounds=rounds).hash(password)
+
+
+def _verify(password, hashed, rounds):
+    handler = pbkdf2_sha256.using(rounds=rounds)
+    if not handler.verify(password, hashed):
+        return False, None
+    if handler.needs_update(hashed):
+        return True, handler.hash(password)
+    return True, None
+
+
+class PasswordHasher:
+    """Runs pbkdf2 hashing and verification in a process pool so request
+    workers are not pinned by it. At most ``PASSWORD_HASH_WORKERS`` +
+    ``PASSWORD_HASH_QUEUE`` jobs may be pending; beyond that requests are
+    rejected with 503. ``PASSWORD_HASH_WORKERS = 0`` hashes inline.
+
+    Every web worker has its own pool, so by default the CPUs are split
+    between the ``WEB_CONCURRENCY`` workers gunicorn is told to run."""
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._slots = None
+        self.rounds = pbkdf2_sha256.default_rounds
+        self.workers = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("PASSWORD_HASH_ROUNDS", pbkdf2_sha256.default_rounds)
+        cpus = max(1, (os.cpu_count() or 1) // int(os.getenv("WEB_CONCURRENCY", 1)))
+        app.config.setdefault("PASSWORD_HASH_WORKERS", cpus)
+        app.config.setdefault("PASSWORD_HASH_QUEUE", 2 * cpus)
+        self.rounds = app.config["PASSWORD_HASH_ROUNDS"]
+        self.workers = app.config["PASSWORD_HASH_WORKERS"]
+        self._slots = threading.BoundedSemaphore(
+            self.workers + app.config["PASSWORD_HASH_QUEUE"]
+        )
+        app.extensions["passwords"] = self
+
+    def hash(self, password):
+        return self._run(_hash, password, self.rounds)
+
+    def verify(self, password, hashed):
+        """Returns whether ``password`` matches and, if the stored hash was made
+        with other parameters, a new hash to replace it with."""
+
+        return self._run(_verify, password, hashed, self.rounds)
+
+    def _run(self, func, *args):
+        if not self.workers:
+            return func(*args)
+        if not self._slots.acquire(blocking=False):
+            abort(
+                503,
+                message="Too many password checks in progress, try again later.",
+                headers={"Retry-After": "1"},
+            )
+        try:
+            return self._get_executor().submit(func, *args).result()
+        finally:
+            self._slots.release()
+
+    def _get_executor(self):
+        # created lazily so that the pool is started after gunicorn forks, and
+        # spawned rather than forked from a process running the job threads;
+        # scripts hashing passwords need an ``if __name__ == "__main__"`` guard
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+        return self._executor
+
+
+passwords = PasswordHasher()
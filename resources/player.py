@@ -1,37 +1,128 @@
 from flask import current_app as app, render_template, flash, redirect, url_for
-from flask_accept import accept_fallback
+from flask_accept import accept_fallback, accept
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from flask_login import login_required, current_user
 from flask.views import MethodView
 from flask_smorest import Blueprint, abort
 
 from .db import db
-from models import PlayerModel, PlayersModel, TeamsModel
+from models import PlayerModel, PlayersModel, TeamModel, TeamsModel
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm import joinedload
 
-from .schemas import PlayerSchema, PlayerUpdateSchema, EditSchema, PLAYER_POSITIONS
+from .schemas import (
+    PlayerSchema,
+    PlayerUpdateSchema,
+    PlayerFilterSchema,
+    SparseSchema,
+    BatchResultSchema,
+    EditSchema,
+    ImageSchema,
+    PLAYER_POSITIONS,
+)
+from .pagination import paginate, next_url, next_link
+from .ndjson import stream_ndjson, NDJSON_MIMETYPE
+from .conditional import Version, if_match_versions
+from .pages import cached_page, pages
+from .images import images
+from .sparse import sparse_response, load_columns, embeds
+from .team import editable_team_ids
 
 
 blp = Blueprint("player", __name__, description="Operations on players.")
 NO_TEAM = TeamsModel(id=None, name="")
 
 
+def filter_players(query, position=None, team_id=None, **team_filters):
+    if position is not None:
+        query = query.filter(PlayersModel.position == position)
+    if team_id is not None:
+        query = query.filter(PlayersModel.team_id == team_id)
+    if team_filters:
+        query = query.join(TeamsModel, PlayersModel.team_id == TeamsModel.id).filter(
+            *(getattr(TeamsModel, key) == value for key, value in team_filters.items())
+        )
+    return query
+
+
+def player_version_query(player_id, with_teams=False):
+    columns = [PlayersModel.version, PlayersModel.updated_at, TeamsModel.updated_at]
+    if with_teams:
+        # the HTML pages also list every team in a dropdown
+        columns += [
+            select(func.max(TeamsModel.updated_at)).scalar_subquery(),
+            select(func.count(TeamsModel.id)).scalar_subquery(),
+        ]
+    return (
+        select(*columns)
+        .outerjoin(TeamsModel, PlayersModel.team_id == TeamsModel.id)
+        .where(PlayersModel.id == player_id)
+    )
+
+
+def player_version(player_id, with_teams=False):
+    row = db.session.execute(player_version_query(player_id, with_teams)).first()
+    return Version(*row[1:], row_version=row[0]) if row else None
+
+
 @blp.route("/player/")
 class AllPlayers(MethodView):
     @accept_fallback
-    def get(self):
+    @cached_page(lambda: pages.table_version("players", "teams"))
+    @blp.arguments(PlayerFilterSchema, location="query", as_kwargs=True)
+    def get(self, limit, cursor=None, **filters):
         app.logger.info("Getting all the players...")
-        players = PlayerModel.query.all()
+        players, next_cursor = paginate(
+            filter_players(
+                PlayerModel.query.options(
+                    joinedload(PlayerModel.team).joinedload(TeamModel.owner)
+                ),
+                **filters,
+            ),
+            PlayerModel.id,
+            limit,
+            cursor,
+        )
         app.logger.info(f"Found {len(players)} players.")
-        return render_template("player/all.html", players=players, title="Players")
+        return render_template(
+            "player/all.html",
+            players=players,
+            title="Players",
+            next_url=next_url(next_cursor, limit=limit, **filters),
+        )
 
     @get.support("application/json")
+    @blp.arguments(PlayerFilterSchema, location="query", as_kwargs=True)
+    @blp.arguments(SparseSchema, location="query", as_kwargs=True)
     @blp.response(200, PlayerUpdateSchema(many=True))
-    def get_json(self):
+    def get_json(self, limit, cursor=None, only=None, embed=None, **filters):
         app.logger.info("Getting all the players...")
-        players = PlayersModel.query.all()
+        players, next_cursor = paginate(
+            filter_players(
+                PlayersModel.query.options(*load_columns(PlayersModel, only)),
+                **filters,
+            ),
+            PlayersModel.id,
+            limit,
+            cursor,
+        )
         app.logger.info(f"Found {len(players)} players.")
-        return players
+        return (
+            sparse_response(PlayerUpdateSchema, players, only, embed, many=True),
+            next_link(next_cursor, limit=limit, **filters),
+        )
+
+    @get.support(NDJSON_MIMETYPE)
+    @blp.arguments(PlayerFilterSchema, location="query", as_kwargs=True)
+    def get_ndjson(self, limit, cursor=None, **filters):
+        app.logger.info("Exporting all the players...")
+        return stream_ndjson(
+            filter_players(PlayersModel.query, **filters),
+            PlayersModel.id,
+            PlayerUpdateSchema(),
+            cursor,
+        )
 
     @accept_fallback
     @login_required
@@ -58,7 +149,7 @@ class AllPlayers(MethodView):
                 ),
                 500,
             )
-        app.logger.debug(f"Created player: {player}")
+        app.logger.debug("Created player: %s", player)
         flash(f"Player {player.name!r} created!")
         if player.team_id:
             return redirect(url_for("team.Team", team_id=player.team_id, edit=1))
@@ -76,16 +167,72 @@ class AllPlayers(MethodView):
         except SQLAlchemyError as e:
             app.logger.error(e)
             abort(500, message=f"Error:{e}")
-        app.logger.debug(f"Created player: {player}")
+        app.logger.debug("Created player: %s", player)
         return player, 201
 
 
+@blp.route("/player/batch")
+class PlayerBatch(MethodView):
+    @accept("application/json")
+    @jwt_required()
+    @blp.arguments(PlayerSchema(many=True))
+    @blp.response(200, BatchResultSchema(many=True))
+    def post(self, players_info):
+        app.logger.info(f"Creating {len(players_info)} players...")
+        team_ids = editable_team_ids(
+            {info["team_id"] for info in players_info if info.get("team_id")},
+            get_jwt_identity(),
+        )
+        results, rows = [], []
+        for index, info in enumerate(players_info):
+            result = {"index": index, "status": 201}
+            if info.get("team_id") and info["team_id"] not in team_ids:
+                result["status"] = 403
+                result["message"] = "The team must be owned by you or have no owner."
+            else:
+                rows.append(
+                    {
+                        "name": info["name"],
+                        "position": info.get("position"),
+                        "birth_date": info.get("birth_date"),
+                        "team_id": info.get("team_id"),
+                        "portrait": info.get("portrait"),
+                    }
+                )
+            results.append(result)
+        if rows:
+            try:
+                # one multi-row INSERT, its ids put in row order by the
+                # sentinel column of the players table
+                ids = db.session.scalars(
+                    insert(PlayersModel.__table__).returning(
+                        PlayersModel.__table__.c.id, sort_by_parameter_order=True
+                    ),
+                    rows,
+                ).all()
+                db.session.commit()
+            except SQLAlchemyError as e:
+                app.logger.error(e)
+                abort(500, message=f"Error: {e}")
+            created = iter(ids)
+            for result in results:
+                if result["status"] == 201:
+                    result["id"] = next(created)
+        app.logger.debug(f"Created {len(rows)} players.")
+        return results
+
+
 @blp.route("/player/<int:player_id>")
 class Player(MethodView):
     @accept_fallback
+    @cached_page(lambda player_id: player_version(player_id, with_teams=True))
     @blp.arguments(EditSchema, location="query", as_kwargs=True)
     def get(self, player_id, **kwargs):
-        player = PlayerModel.query.get(player_id)
+        version = player_version(player_id, with_teams=True)
+        not_modified = version and version.not_modified("html")
+        if not_modified:
+            return not_modified
+        player = PlayerModel.query.options(joinedload(PlayerModel.team)).get(player_id)
         if not player:
             return (
                 render_template(
@@ -95,37 +242,54 @@ class Player(MethodView):
                 ),
                 404,
             )
-        app.logger.debug(f"Player: {player}")
+        app.logger.debug("Player: %s", player)
         if (
             "edit" in kwargs
             and current_user.is_authenticated
             and (not player.team or current_user.id == player.team.owner_id)
         ):
             teams = TeamsModel.query.filter_by(owner_id=current_user.id).all()
-            return render_template(
-                "player/edit.html",
-                title=f"Player: {player.name}",
-                positions=PLAYER_POSITIONS,
-                teams=[NO_TEAM] + teams,
-                player=player,
+            return (
+                render_template(
+                    "player/edit.html",
+                    title=f"Player: {player.name}",
+                    positions=PLAYER_POSITIONS,
+                    teams=[NO_TEAM] + teams,
+                    player=player,
+                ),
+                version.headers("html"),
             )
         else:
             teams = TeamsModel.query.all()
-            return render_template(
-                "player/view.html",
-                title=f"Player: {player.name}",
-                positions=PLAYER_POSITIONS,
-                teams=[NO_TEAM] + teams,
-                player=player,
+            return (
+                render_template(
+                    "player/view.html",
+                    title=f"Player: {player.name}",
+                    positions=PLAYER_POSITIONS,
+                    teams=[NO_TEAM] + teams,
+                    player=player,
+                ),
+                version.headers("html"),
             )
 
     @get.support("application/json")
+    @blp.arguments(SparseSchema, location="query", as_kwargs=True)
     @blp.response(200, PlayerSchema)
-    def get_json(self, player_id):
+    def get_json(self, player_id, only=None, embed=None):
         app.logger.info(f"Getting player {player_id!r}...")
-        player = PlayerModel.query.get_or_404(player_id)
-        app.logger.debug(f"Player: {player}")
-        return player
+        version = player_version(player_id)
+        not_modified = version and version.not_modified("json")
+        if not_modified:
+            return not_modified
+        options = load_columns(PlayerModel, only)
+        if embeds("team", only, embed):
+            options.append(joinedload(PlayerModel.team))
+        player = PlayerModel.query.options(*options).get_or_404(player_id)
+        app.logger.debug("Player: %s", player)
+        return (
+            sparse_response(PlayerSchema, player, only, embed),
+            version.headers("json"),
+        )
 
     @accept_fallback
     @login_required
@@ -168,7 +332,7 @@ class Player(MethodView):
     @blp.response(200, schema=PlayerSchema)
     def put(self, player_info, player_id):
         app.logger.info(f"Updating player {player_id!r}...")
-        app.logger.debug(f"Update value: {player_info}")
+        app.logger.debug("Update value: %s", player_info)
         player = PlayerModel.query.get(player_id)
         if not player:
             flash("Failed to update player!")
@@ -188,7 +352,7 @@ class Player(MethodView):
             db.session.commit()
         except SQLAlchemyError as e:
             abort(500, message=f"Error: {e}")
-        app.logger.debug(f"Player updated: {player}")
+        app.logger.debug("Player updated: %s", player)
         return player
 
     @put.support("application/json")
@@ -197,7 +361,80 @@ class Player(MethodView):
     @blp.response(200, schema=PlayerSchema)
     def put_json(self, player_info, player_id):
         app.logger.info(f"Updating player {player_id!r}...")
-        app.logger.debug(f"Update value: {player_info}")
+        app.logger.debug("Update value: %s", player_info)
+        user_id = get_jwt_identity()
+        versions = if_match_versions()
+        # a compare-and-swap on the row, answered with the row it returns; the
+        # row is only read again if it fails, to tell why
+        statement = update(PlayersModel).where(
+            PlayersModel.id == player_id,
+            ~select(TeamsModel.id)
+            .where(
+                TeamsModel.id == PlayersModel.team_id,
+                TeamsModel.owner_id.is_not(None),
+                TeamsModel.owner_id != user_id,
+            )
+            .exists(),
+        )
+        if versions is not None:
+            statement = statement.where(PlayersModel.version.in_(versions))
+        try:
+            row = db.session.execute(
+                statement.values(**player_info)
+                .returning(*PlayersModel.__table__.columns)
+                .execution_options(synchronize_session=False)
+            ).first()
+            db.session.commit()
+        except SQLAlchemyError as e:
+            abort(500, message=f"Error: {e}")
+        if row is None:
+            player = PlayerModel.query.get_or_404(player_id)
+            if player.team and player.team.owner_id and player.team.owner_id != user_id:
+                abort(
+                    403,
+                    message="The player must be owned by one of your teams or have no owner to be edited.",
+                )
+            abort(412, message="The player was changed since it was read.")
+        player = dict(row._mapping)
+        player["team"] = (
+            db.session.get(TeamsModel, row.team_id) if row.team_id else None
+        )
+        app.logger.debug("Player updated: %s", player)
+        return player
+
+
+@blp.route("/player/<int:player_id>/portrait")
+class PlayerPortrait(MethodView):
+    @accept_fallback
+    @login_required
+    @blp.arguments(ImageSchema, location="files")
+    def post(self, files, player_id):
+        app.logger.info(f"Uploading the portrait of player {player_id!r}...")
+        player = PlayerModel.query.get_or_404(player_id)
+        if (
+            player.team
+            and player.team.owner_id
+            and player.team.owner_id != current_user.id
+        ):
+            flash(
+                "The player must be owned by one of your teams or have no owner to be edited."
+            )
+            return redirect(url_for("player.Player", player_id=player_id))
+        player.portrait = images.save(files["image"])
+        try:
+            db.session.commit()
+        except SQLAlchemyError as e:
+            abort(500, message=f"Error: {e}")
+        app.logger.debug("Player updated: %s", player)
+        flash("Portrait uploaded!")
+        return redirect(url_for("player.Player", player_id=player_id, edit=1))
+
+    @post.support("application/json")
+    @jwt_required()
+    @blp.arguments(ImageSchema, location="files")
+    @blp.response(200, schema=PlayerSchema)
+    def post_json(self, files, player_id):
+        app.logger.info(f"Uploading the portrait of player {player_id!r}...")
         player = PlayerModel.query.get_or_404(player_id)
         if (
             player.team
@@ -208,22 +445,12 @@ class Player(MethodView):
                 403,
                 message="The player must be owned by one of your teams or have no owner to be edited.",
             )
-        if "name" in player_info:
-            player.name = player_info["name"]
-        if "birth_date" in player_info:
-            player.birth_date = player_info["birth_date"]
-        if "position" in player_info:
-            player.position = player_info["position"]
-        if "team_id" in player_info:
-            player.team_id = player_info["team_id"]
-        if "portrait" in player_info:
-            player.portrait = player_info["portrait"]
+        player.portrait = images.save(files["image"])
         try:
-            db.session.add(player)
             db.session.commit()
         except SQLAlchemyError as e:
             abort(500, message=f"Error: {e}")
-        app.logger.debug(f"Player updated: {player}")
+        app.logger.debug("Player updated: %s", player)
         return player
 
 
@@ -0,0 +1,113 @@
+import socketserver
+import threading
+import time
+from collections import OrderedDict
+from .cache import encode_command, read_reply
+
+
+class Store:
+    """The subset of Redis used by ``RESPCache``: GET, SET (PX/EX/NX), DEL,
+    INCR, FLUSHDB, SELECT and PING.
+
+    Beyond ``max_keys`` keys, the least recently used key with an expiry is
+    evicted, as Redis does with ``maxmemory-policy volatile-lru``, so the
+    generation counters, which have none, are kept.
+    """
+
+    def __init__(self, max_keys=100_000):
+        self.lock = threading.Lock()
+        self.items = OrderedDict()
+        self.max_keys = max_keys
+
+    def execute(self, command, *args):
+        handler = getattr(self, f"do_{command.decode().lower()}", None)
+        if handler is None:
+            return RuntimeError(f"ERR unknown command {command.decode()!r}")
+        with self.lock:
+            return handler(*args)
+
+    def do_ping(self):
+        return "PONG"
+
+    def do_select(self, db):
+        return "OK"
+
+    def do_get(self, key):
+        item = self.items.get(key)
+        if item is None:
+            return None
+        value, expires = item
+        if expires is not None and expires <= time.monotonic():
+            del self.items[key]
+            return None
+        self.items.move_to_end(key)
+        return value
+
+    def do_set(self, key, value, *options):
+        options = [option.upper() for option in options]
+        expires = None
+        if b"PX" in options:
+            expires = time.monotonic() + int(options[options.index(b"PX") + 1]) / 1000
+        elif b"EX" in options:
+            expires = time.monotonic() + int(options[options.index(b"EX") + 1])
+        if b"NX" in options and self.do_get(key) is not None:
+            return None
+        self.items[key] = (value, expires)
+        self.items.move_to_end(key)
+        self._evict()
+        return "OK"
+
+    def do_del(self, *keys):
+        return sum(self.items.pop(key, None) is not None for key in keys)
+
+    def do_incr(self, key):
+        value = int(self.do_get(key) or 0) + 1
+        expires = self.items.get(key, (None, None))[1]
+        self.items[key] = (str(value).encode(), expires)
+        self._evict()
+        return value
+
+    def do_flushdb(self):
+        self.items.clear()
+        return "OK"
+
+    def _evict(self):
+        if len(self.items) <= self.max_keys:
+            return
+        for key, (value, expires) in self.items.items():
+            if expires is not None:
+                del self.items[key]
+                return
+
+
+class RESPHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                command = read_reply(self.rfile)
+            except EOFError:
+                return
+            self.wfile.write(encode_reply(self.server.store.execute(*command)))
+
+
+def encode_reply(value):
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, RuntimeError):
+        return b"-%s\r\n" % str(value).encode()
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, str):
+        return b"+%s\r\n" % value.encode()
+    return encode_command(value)[len(b"*1\r\n") :]
+
+
+class RESPServer(socketserver.ThreadingTCPServer):
+    """In-memory stand-in for a Redis server, for local development only."""
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address, max_keys=100_000):
+        super().__init__(address, RESPHandler)
+        self.store = Store(max_keys)
@@ -1,7 +1,9 @@
 from marshmallow import Schema, fields
-from marshmallow.validate import OneOf
-from datetime import date, datetime
-from uuid import UUID
+from marshmallow.validate import OneOf, Range
+from datetime import date
+from flask_smorest.fields import Upload
+from webargs.fields import DelimitedList
+from .serializers import FastSchema
 
 PLAYER_POSITIONS = [
     "",
@@ -23,6 +25,9 @@ PLAYER_POSITIONS = [
     "CF",
 ]
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
 BRAZILIAN_STATES = [
     "",
     "AC",
@@ -55,35 +60,42 @@ BRAZILIAN_STATES = [
 ]
 
 
-class TeamUpdateSchema(Schema):
+class TeamUpdateSchema(FastSchema):
     id = fields.Integer(dump_only=True)
+    version = fields.Integer(dump_only=True)
     name = fields.Str()
     foundation_date = fields.Date(allow_none=True)
     stadium = fields.Str()
     city = fields.Str()
     state = fields.Str(validate=OneOf(BRAZILIAN_STATES))
-    logo = fields.Url(allow_none=True)
+    logo = fields.Url(relative=True, allow_none=True)
 
 
 class TeamBaseSchema(TeamUpdateSchema):
     name = fields.Str(required=True)
 
 
-class PlayerUpdateSchema(Schema):
+class PlayerUpdateSchema(FastSchema):
     id = fields.Integer(dump_only=True)
+    version = fields.Integer(dump_only=True)
     name = fields.Str()
     position = fields.Str(validate=OneOf(PLAYER_POSITIONS))
     birth_date = fields.Date(allow_none=True)
     team_id = fields.Integer(allow_none=True)
-    portrait = fields.Url(allow_none=True)
+    portrait = fields.Url(relative=True, allow_none=True)
+
 
+class PlayerBatchUpdateSchema(PlayerUpdateSchema):
+    id = fields.Integer(required=True)
 
-class PlayerBaseSchema(Schema):
+
+class PlayerBaseSchema(FastSchema):
     id = fields.Integer(dump_only=True)
+    version = fields.Integer(dump_only=True)
     name = fields.Str(required=True)
     position = fields.Str(validate=OneOf(PLAYER_POSITIONS))
     birth_date = fields.Date()
-    portrait = fields.Url(allow_none=True)
+    portrait = fields.Url(relative=True, allow_none=True)
 
 
 class PlayerSchema(PlayerBaseSchema):
@@ -91,7 +103,7 @@ class PlayerSchema(PlayerBaseSchema):
     team = fields.Nested(TeamBaseSchema(), dump_only=True)
 
 
-class UserBaseSchema(Schema):
+class UserBaseSchema(FastSchema):
     id = fields.Int(dump_only=True)
     username = fields.Str(required=True)
     email = fields.Email(required=True, dump_only=True)
@@ -119,14 +131,73 @@ class NextSchema(Schema):
     next = fields.Str()
 
 
-def serialize(obj):
-    """JSON serializer for objects not serializable by default json code"""
+class SparseSchema(Schema):
+    only = DelimitedList(fields.Str(), data_key="fields")
+    embed = DelimitedList(fields.Str())
+
+
+class ImageSchema(Schema):
+    image = Upload(required=True)
+
+
+class ImportSchema(Schema):
+    file = Upload(required=True)
+
+
+class PlayerIdsSchema(Schema):
+    ids = fields.List(fields.Int(), required=True)
+
+
+class BatchResultSchema(Schema):
+    index = fields.Int()
+    id = fields.Int()
+    status = fields.Int()
+    message = fields.Str()
+
+
+class ImportResultSchema(Schema):
+    created = fields.Int()
+    failed = fields.Int()
+    errors = fields.List(fields.Nested(BatchResultSchema))
+
 
-    if isinstance(obj, (datetime, date)):
-        return obj.isoformat()
-    if isinstance(obj, UUID):
-        return str(obj)
-    raise TypeError("Type %s not serializable" % type(obj))
+class TeamStatsSchema(Schema):
+    team_id = fields.Int()
+    players = fields.Int()
+    average_age = fields.Float(allow_none=True)
+    positions = fields.Dict(keys=fields.Str(), values=fields.Int())
+
+
+class PageSchema(Schema):
+    limit = fields.Int(
+        load_default=DEFAULT_PAGE_SIZE, validate=Range(min=1, max=MAX_PAGE_SIZE)
+    )
+    cursor = fields.Int(validate=Range(min=0))
+
+
+class TeamFilterSchema(PageSchema):
+    city = fields.Str()
+    state = fields.Str(validate=OneOf(BRAZILIAN_STATES))
+    owner_id = fields.Int()
+
+
+class SearchSchema(Schema):
+    q = fields.Str(required=True)
+    limit = fields.Int(
+        load_default=DEFAULT_PAGE_SIZE, validate=Range(min=1, max=MAX_PAGE_SIZE)
+    )
+    offset = fields.Int(load_default=0, validate=Range(min=0))
+
+
+class SearchResultSchema(Schema):
+    type = fields.Str()
+    id = fields.Int()
+    name = fields.Str()
+
+
+class PlayerFilterSchema(TeamFilterSchema):
+    position = fields.Str(validate=OneOf(PLAYER_POSITIONS))
+    team_id = fields.Int()
 
 
 def string_parser(obj):
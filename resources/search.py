@@ -0,0 +1,160 @@
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+from flask import current_app as app
+from flask_accept import accept
+from flask_smorest import Blueprint
+from flask.views import MethodView
+from sqlalchemy import inspect, select, text
+from models import PlayersModel, TeamsModel
+from .db import db
+from .schemas import SearchSchema, SearchResultSchema
+
+blp = Blueprint("search", __name__, description="Search over teams and players.")
+
+FTS_QUERY = text(
+    "SELECT 'team' AS type, rowid AS id, name, bm25(teams_fts) AS rank "
+    "FROM teams_fts WHERE teams_fts MATCH :query "
+    "UNION ALL "
+    "SELECT 'player' AS type, rowid AS id, name, bm25(players_fts) AS rank "
+    "FROM players_fts WHERE players_fts MATCH :query "
+    "ORDER BY rank LIMIT :limit OFFSET :offset"
+)
+
+
+def normalize(value):
+    """Case- and accent-insensitive form of ``value``."""
+
+    decomposed = unicodedata.normalize("NFKD", value or "")
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def tokenize(value):
+    return re.findall(r"\w+", normalize(value))
+
+
+def include_name(name, type_, parent_names):
+    """Keeps the FTS tables, which are not models, out of autogenerate."""
+
+    return not (type_ == "table" and "_fts" in name)
+
+
+class FallbackIndex:
+    """In-process inverted index, used when the database has no FTS5 tables.
+
+    It is rebuilt from the database when older than ``SEARCH_INDEX_TTL``
+    seconds, so results may lag behind writes by that much.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._built_at = None
+        self._postings = {}
+        self._vocabulary = []
+        self._documents = {}
+
+    def search(self, query, limit, offset):
+        self._refresh()
+        tokens = tokenize(query)
+        matches = None
+        for token in tokens:
+            documents = set()
+            start = bisect_left(self._vocabulary, token)
+            for word in self._vocabulary[start:]:
+                if not word.startswith(token):
+                    break
+                documents |= self._postings[word]
+            matches = documents if matches is None else matches & documents
+        ranked = sorted(matches or (), key=lambda key: self._rank(key, tokens))
+        return [
+            {"type": key[0], "id": key[1], "name": self._documents[key][0]}
+            for key in ranked[offset : offset + limit]
+        ]
+
+    def _rank(self, key, tokens):
+        name, name_tokens = self._documents[key]
+        in_name = sum(
+            any(word.startswith(token) for word in name_tokens) for token in tokens
+        )
+        return (-in_name, len(name), key)
+
+    def _refresh(self):
+        ttl = app.config["SEARCH_INDEX_TTL"]
+        if self._built_at is not None and time.monotonic() - self._built_at < ttl:
+            return
+        with self._lock:
+            if self._built_at is not None and time.monotonic() - self._built_at < ttl:
+                return
+            postings, documents = {}, {}
+            rows = chain_rows(
+                (
+                    "team",
+                    select(
+                        TeamsModel.id,
+                        TeamsModel.name,
+                        TeamsModel.stadium,
+                        TeamsModel.city,
+                    ),
+                ),
+                ("player", select(PlayersModel.id, PlayersModel.name)),
+            )
+            for type_, (id, name, *fields) in rows:
+                key = (type_, id)
+                documents[key] = (name, tokenize(name))
+                for field in (name, *fields):
+                    for word in tokenize(field):
+                        postings.setdefault(word, set()).add(key)
+            self._postings = postings
+            self._vocabulary = sorted(postings)
+            self._documents = documents
+            self._built_at = time.monotonic()
+
+
+def chain_rows(*queries):
+    for type_, query in queries:
+        for row in db.session.execute(query.execution_options(yield_per=1000)):
+            yield type_, row
+
+
+fallback_index = FallbackIndex()
+
+
+def has_fts():
+    if "search_fts" not in app.extensions:
+        engine = db.engine
+        app.extensions["search_fts"] = engine.dialect.name == "sqlite" and all(
+            inspect(engine).has_table(f"{table}_fts") for table in ("teams", "players")
+        )
+    return app.extensions["search_fts"]
+
+
+@blp.route("/search")
+class Search(MethodView):
+    @accept("application/json")
+    @blp.arguments(SearchSchema, location="query")
+    @blp.response(200, SearchResultSchema(many=True))
+    def get(self, search_info):
+        app.logger.info(f"Searching for {search_info['q']!r}...")
+        tokens = tokenize(search_info["q"])
+        if not tokens:
+            return []
+        if not has_fts():
+            return fallback_index.search(
+                search_info["q"], search_info["limit"], search_info["offset"]
+            )
+        # every token is quoted so user input cannot inject FTS syntax
+        query = " ".join(f'"{token}"*' for token in tokens)
+        return (
+            db.session.execute(
+                FTS_QUERY,
+                {
+                    "query": query,
+                    "limit": search_info["limit"],
+                    "offset": search_info["offset"],
+                },
+            )
+            .mappings()
+            .all()
+        )
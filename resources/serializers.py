@@ -0,0 +1,93 @@
+from datetime import date
+from functools import cached_property
+from marshmallow import Schema, fields, missing
+
+# fields dumped by a plain conversion of the attribute, mirroring their
+# ``_serialize``; subclasses are left to marshmallow as they may override it
+CONVERTERS = {
+    fields.String: str,
+    fields.Url: str,
+    fields.Email: str,
+    fields.Integer: int,
+    fields.Float: float,
+}
+
+
+def compile_dumper(schema):
+    """Generates a function dumping one object the way ``schema`` does.
+
+    Returns ``None`` when the schema uses anything the generated code does
+    not reproduce exactly (hooks, defaults, dotted attributes, other field
+    types), in which case marshmallow has to dump it.
+    """
+
+    if any(schema._hooks.values()):
+        return None
+    namespace = {"missing": missing, "dump_schema": Schema.dump, "schema": schema}
+    lines = [
+        "def dump(obj):",
+        "    if isinstance(obj, dict):",
+        "        return dump_schema(schema, obj, many=False)",
+        "    result = {}",
+    ]
+    for index, (name, field) in enumerate(schema.dump_fields.items()):
+        attribute = field.attribute or name
+        key = field.data_key if field.data_key is not None else name
+        if "." in attribute or field.dump_default is not missing:
+            return None
+        expression = compile_field(field, f"field_{index}", namespace)
+        if expression is None:
+            return None
+        lines += [
+            f"    value = getattr(obj, {attribute!r}, missing)",
+            "    if value is not missing:",
+            f"        result[{key!r}] = None if value is None else {expression}",
+        ]
+    lines.append("    return result")
+    exec("\n".join(lines), namespace)
+    return namespace["dump"]
+
+
+def compile_field(field, name, namespace, value="value"):
+    """Expression converting a non-null ``value`` as ``field`` would."""
+
+    if type(field) in CONVERTERS and not getattr(field, "as_string", False):
+        namespace[name] = CONVERTERS[type(field)]
+        return f"{name}({value})"
+    if type(field) is fields.Date and (field.format or "iso") in ("iso", "iso8601"):
+        namespace[name] = date.isoformat
+        return f"{name}({value})"
+    if type(field) is fields.Nested:
+        nested = compile_dumper(field.schema)
+        if nested is None:
+            return None
+        namespace[name] = nested
+        if field.schema.many or field.many:
+            return f"[{name}(item) for item in {value}]"
+        return f"{name}({value})"
+    if type(field) is fields.List and value == "value":
+        item = compile_field(field.inner, name, namespace, value="item")
+        if item is None:
+            return None
+        return f"[None if item is None else {item} for item in value]"
+    return None
+
+
+class FastSchema(Schema):
+    """Schema whose ``dump`` runs a function generated from its fields the
+    first time it is used, instead of going through marshmallow field by
+    field. The output is the same; schemas the generator cannot handle are
+    dumped by marshmallow as usual.
+    """
+
+    @cached_property
+    def _dumper(self):
+        return compile_dumper(self)
+
+    def dump(self, obj, *, many=None):
+        dumper = self._dumper
+        if dumper is None:
+            return super().dump(obj, many=many)
+        if self.many if many is None else many:
+            return [dumper(item) for item in obj]
+        return dumper(obj)
@@ -0,0 +1,57 @@
+from functools import lru_cache
+from flask import jsonify
+from flask_smorest import abort
+from marshmallow import fields
+from sqlalchemy.orm import load_only
+
+
+def nested_fields(schema_class):
+    return {
+        name
+        for name, field in schema_class._declared_fields.items()
+        if isinstance(field, fields.Nested)
+        or (isinstance(field, fields.List) and isinstance(field.inner, fields.Nested))
+    }
+
+
+def embeds(name, only=None, embed=None):
+    """Whether the nested field ``name`` is part of the requested dump."""
+
+    return (only is None or name in only) and (embed is None or name in embed)
+
+
+def load_columns(model, only=None):
+    """Query options loading only the columns behind the requested fields."""
+
+    if only is None:
+        return []
+    columns = [getattr(model, name) for name in only if name in model.__table__.c]
+    return [load_only(*columns)] if columns else [load_only(model.id)]
+
+
+@lru_cache(maxsize=256)
+def sparse_schema(schema_class, only, exclude, many):
+    """Schema instances are reused so their dump function is generated once."""
+
+    return schema_class(only=only, exclude=exclude, many=many)
+
+
+def sparse_response(schema_class, obj, only=None, embed=None, many=False):
+    """Dumps ``obj`` keeping only the ``fields`` and ``embed`` asked for.
+
+    Without either argument ``obj`` is returned as is for ``@blp.response``
+    to dump with the full schema.
+    """
+
+    if only is None and embed is None:
+        return obj
+    exclude = frozenset()
+    if embed is not None:
+        exclude = frozenset(nested_fields(schema_class) - set(embed))
+    if only is not None:
+        unknown = set(only) - set(schema_class._declared_fields)
+        if unknown:
+            abort(400, message=f"Unknown fields: {', '.join(sorted(unknown))}.")
+        only = tuple(sorted(set(only)))
+    schema = sparse_schema(schema_class, only, exclude, many)
+    return jsonify(schema.dump(obj))
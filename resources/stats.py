@@ -0,0 +1,88 @@
+from datetime import date
+from flask import current_app as app
+from sqlalchemy import func, select, text
+from models import PlayersModel, TeamStatsModel
+from .db import db
+
+EPOCH = date(1970, 1, 1)
+DAYS_PER_YEAR = 365.2425
+
+
+def has_counters():
+    """Whether ``team_stats`` is kept up to date by the triggers of its
+    migration. Without them (other databases, or tables made by
+    ``create_all``) the statistics are aggregated from ``players``."""
+
+    if "team_stats_counters" not in app.extensions:
+        app.extensions["team_stats_counters"] = (
+            db.engine.dialect.name == "sqlite"
+            and bool(
+                db.session.scalar(
+                    text(
+                        "SELECT 1 FROM sqlite_master "
+                        "WHERE type = 'trigger' AND name = 'players_team_stats_insert'"
+                    )
+                )
+            )
+        )
+    return app.extensions["team_stats_counters"]
+
+
+def counters(team_ids):
+    """(team, position, players, players with a birth date, sum of their birth
+    dates in days since 1970-01-01) rows of ``team_ids``."""
+
+    if has_counters():
+        return db.session.execute(
+            select(
+                TeamStatsModel.team_id,
+                TeamStatsModel.position,
+                TeamStatsModel.players,
+                TeamStatsModel.birth_dates,
+                TeamStatsModel.birth_date_days,
+            ).where(TeamStatsModel.team_id.in_(team_ids))
+        ).all()
+    rows = db.session.execute(
+        select(
+            PlayersModel.team_id,
+            PlayersModel.position,
+            PlayersModel.birth_date,
+            func.count(PlayersModel.id),
+        )
+        .where(PlayersModel.team_id.in_(team_ids))
+        .group_by(PlayersModel.team_id, PlayersModel.position, PlayersModel.birth_date)
+    )
+    return [
+        (
+            team_id,
+            position or "",
+            players,
+            players if birth_date else 0,
+            (birth_date - EPOCH).days * players if birth_date else 0,
+        )
+        for team_id, position, birth_date, players in rows
+    ]
+
+
+def team_stats(team_ids):
+    """Squad size, average age in years and players per position of each of
+    ``team_ids``, in that order."""
+
+    stats = {
+        team_id: {"team_id": team_id, "players": 0, "positions": {}}
+        for team_id in team_ids
+    }
+    birth_dates = {team_id: [0, 0.0] for team_id in team_ids}
+    for team_id, position, players, dated, days in counters(team_ids):
+        stats[team_id]["players"] += players
+        if position:
+            positions = stats[team_id]["positions"]
+            positions[position] = positions.get(position, 0) + players
+        birth_dates[team_id][0] += dated
+        birth_dates[team_id][1] += days
+    today = (date.today() - EPOCH).days
+    for team_id, (dated, days) in birth_dates.items():
+        stats[team_id]["average_age"] = (
+            round((today - days / dated) / DAYS_PER_YEAR, 2) if dated else None
+        )
+    return [stats[team_id] for team_id in team_ids]
@@ -5,37 +5,143 @@ from flask_login import login_required, current_user
 from flask_smorest import Blueprint, abort
 from flask.views import MethodView
 from models import TeamModel, TeamsModel, PlayersModel, TeamPlayersModel
-from .db import db
+from .db import db, utcnow
 from .schemas import (
     TeamSchema,
     TeamUpdateSchema,
     PlayerSchema,
+    PlayerBatchUpdateSchema,
+    PlayerIdsSchema,
+    BatchResultSchema,
     EditSchema,
+    ImageSchema,
+    TeamFilterSchema,
+    TeamStatsSchema,
+    SparseSchema,
     BRAZILIAN_STATES,
 )
+from .pagination import paginate, next_url, next_link
+from .ndjson import stream_ndjson, NDJSON_MIMETYPE
+from .conditional import Version, if_match_versions
+from .pages import cached_page, pages
+from .images import images
+from .stats import team_stats
+from .sparse import sparse_response, load_columns
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+from sqlalchemy import delete, func, or_, select, update
+from sqlalchemy.orm import joinedload
 
 
 blp = Blueprint("team", __name__, description="Operations on teams.")
 
 
+def team_version_query(team_id):
+    return (
+        select(
+            TeamsModel.version,
+            TeamsModel.updated_at,
+            func.max(PlayersModel.updated_at),
+            func.count(PlayersModel.id),
+        )
+        .outerjoin(PlayersModel, PlayersModel.team_id == TeamsModel.id)
+        .where(TeamsModel.id == team_id)
+        .group_by(TeamsModel.id)
+    )
+
+
+def team_version(team_id):
+    row = db.session.execute(team_version_query(team_id)).first()
+    return Version(*row[1:], row_version=row[0]) if row else None
+
+
+def detach_players(team_id):
+    # in the same commit as the delete, since a new team may be given the same id
+    db.session.execute(
+        update(PlayersModel)
+        .where(PlayersModel.team_id == team_id)
+        .values(team_id=None)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def editable_team_ids(team_ids, user_id):
+    """Returns which of ``team_ids`` exist and are owned by ``user_id`` or by nobody."""
+
+    if not team_ids:
+        return set()
+    return set(
+        db.session.scalars(
+            select(TeamsModel.id).where(
+                TeamsModel.id.in_(team_ids),
+                or_(TeamsModel.owner_id.is_(None), TeamsModel.owner_id == user_id),
+            )
+        )
+    )
+
+
+def get_editable_team(team_id):
+    team = TeamsModel.query.get_or_404(team_id)
+    if team.owner_id and team.owner_id != get_jwt_identity():
+        abort(
+            403,
+            message="The team must be owned by you or have no owner to be edited.",
+        )
+    return team
+
+
 @blp.route("/team/")
 class AllTeams(MethodView):
     @accept_fallback
-    def get(self):
+    @cached_page(lambda: pages.table_version("teams"))
+    @blp.arguments(TeamFilterSchema, location="query", as_kwargs=True)
+    def get(self, limit, cursor=None, **filters):
         app.logger.info("Getting all the teams...")
-        teams = TeamModel.query.all()
+        teams, next_cursor = paginate(
+            TeamModel.query.options(joinedload(TeamModel.owner)).filter_by(**filters),
+            TeamModel.id,
+            limit,
+            cursor,
+        )
         app.logger.info(f"Found {len(teams)} teams.")
-        return render_template("team/all.html", teams=teams, title="Teams")
+        return render_template(
+            "team/all.html",
+            teams=teams,
+            title="Teams",
+            next_url=next_url(next_cursor, limit=limit, **filters),
+        )
 
     @get.support("application/json")
     @jwt_required()
+    @blp.arguments(TeamFilterSchema, location="query", as_kwargs=True)
+    @blp.arguments(SparseSchema, location="query", as_kwargs=True)
     @blp.response(200, TeamSchema(many=True))
-    def get_json(self):
+    def get_json(self, limit, cursor=None, only=None, embed=None, **filters):
         app.logger.info("Getting all the teams...")
-        teams = TeamsModel.query.all()
+        teams, next_cursor = paginate(
+            TeamsModel.query.options(*load_columns(TeamsModel, only)).filter_by(
+                **filters
+            ),
+            TeamsModel.id,
+            limit,
+            cursor,
+        )
         app.logger.info(f"Found {len(teams)} teams.")
-        return teams
+        return (
+            sparse_response(TeamSchema, teams, only, embed, many=True),
+            next_link(next_cursor, limit=limit, **filters),
+        )
+
+    @get.support(NDJSON_MIMETYPE)
+    @jwt_required()
+    @blp.arguments(TeamFilterSchema, location="query", as_kwargs=True)
+    def get_ndjson(self, limit, cursor=None, **filters):
+        app.logger.info("Exporting all the teams...")
+        return stream_ndjson(
+            TeamsModel.query.filter_by(**filters),
+            TeamsModel.id,
+            TeamUpdateSchema(),
+            cursor,
+        )
 
     @accept_fallback
     @login_required
@@ -70,7 +176,7 @@ class AllTeams(MethodView):
                 ),
                 500,
             )
-        app.logger.debug(f"Created team: {team}")
+        app.logger.debug("Created team: %s", team)
         flash(f"Team {team.name!r} created!")
         return redirect(url_for("user.User"))
 
@@ -89,16 +195,21 @@ class AllTeams(MethodView):
         except SQLAlchemyError as e:
             app.logger.error(e)
             abort(500, message=f"Error: {e}")
-        app.logger.debug(f"Created team: {team}")
+        app.logger.debug("Created team: %s", team)
         return team, 201
 
 
 @blp.route("/team/<int:team_id>")
 class Team(MethodView):
     @accept_fallback
+    @cached_page(team_version)
     @blp.arguments(EditSchema, location="query", as_kwargs=True)
     def get(self, team_id, **kwargs):
-        team = TeamModel.query.get(team_id)
+        version = team_version(team_id)
+        not_modified = version and version.not_modified("html")
+        if not_modified:
+            return not_modified
+        team = TeamModel.query.options(joinedload(TeamModel.owner)).get(team_id)
         if not team:
             return (
                 render_template(
@@ -108,32 +219,48 @@ class Team(MethodView):
                 ),
                 404,
             )
-        app.logger.debug(f"Team: {team}")
+        app.logger.debug("Team: %s", team)
+        players = team.players.all()
         if (
             "edit" in kwargs
             and current_user.is_authenticated
             and (not team.owner_id or current_user.id == team.owner_id)
         ):
-            return render_template(
-                "team/edit.html",
-                title=f"Team: {team.name}",
-                states=BRAZILIAN_STATES,
-                team=team,
+            return (
+                render_template(
+                    "team/edit.html",
+                    title=f"Team: {team.name}",
+                    states=BRAZILIAN_STATES,
+                    team=team,
+                    players=players,
+                ),
+                version.headers("html"),
             )
         else:
-            return render_template(
-                "team/view.html",
-                title=f"Team: {team.name}",
-                states=BRAZILIAN_STATES,
-                team=team,
+            return (
+                render_template(
+                    "team/view.html",
+                    title=f"Team: {team.name}",
+                    states=BRAZILIAN_STATES,
+                    team=team,
+                    players=players,
+                ),
+                version.headers("html"),
             )
 
     @get.support("application/json")
+    @blp.arguments(SparseSchema, location="query", as_kwargs=True)
     @blp.response(200, TeamSchema)
-    def get_json(self, team_id):
+    def get_json(self, team_id, only=None, embed=None):
         app.logger.info(f"Getting team {team_id!r}...")
-        team = TeamModel.query.get_or_404(team_id)
-        return team
+        version = team_version(team_id)
+        not_modified = version and version.not_modified("json")
+        if not_modified:
+            return not_modified
+        team = TeamModel.query.options(*load_columns(TeamModel, only)).get_or_404(
+            team_id
+        )
+        return sparse_response(TeamSchema, team, only, embed), version.headers("json")
 
     @accept_fallback
     @login_required
@@ -144,6 +271,7 @@ class Team(MethodView):
             flash("Failed to delete team!")
             abort(404)
         db.session.delete(team)
+        detach_players(team_id)
         db.session.commit()
         message = f"Team {team.name!r} deleted!"
         app.logger.debug(message)
@@ -161,6 +289,7 @@ class Team(MethodView):
                 message="The team must be owned by you or have no owner to be deleted.",
             )
         db.session.delete(team)
+        detach_players(team_id)
         db.session.commit()
         message = f"Deleted team: {team_id!r}"
         app.logger.debug(message)
@@ -172,7 +301,7 @@ class Team(MethodView):
     @blp.response(200, schema=TeamSchema)
     def put(self, team_info, team_id):
         app.logger.info(f"Updating team {team_id!r}...")
-        app.logger.debug(f"Update value: {team_info}")
+        app.logger.debug("Update value: %s", team_info)
         team = TeamsModel.query.get(team_id)
         if not team:
             flash("Failed to update team!")
@@ -197,7 +326,7 @@ class Team(MethodView):
             abort(400, message=f"Error: {e}")
         except SQLAlchemyError as e:
             abort(500, message=f"Error: {e}")
-        app.logger.debug(f"Team updated: {team}")
+        app.logger.debug("Team updated: %s", team)
         return team
 
     @put.support("application/json")
@@ -206,46 +335,205 @@ class Team(MethodView):
     @blp.response(200, schema=TeamSchema)
     def put_json(self, team_info, team_id):
         app.logger.info(f"Updating team {team_id!r}...")
-        app.logger.debug(f"Update value: {team_info}")
-        team = TeamsModel.query.get_or_404(team_id)
-        if team.owner_id and team.owner_id != get_jwt_identity():
-            abort(
-                403,
-                message="The team must be owned by you or have no owner to be edited.",
-            )
-        if "name" in team_info:
-            team.name = team_info["name"]
-        if "stadium" in team_info:
-            team.stadium = team_info["stadium"]
-        if "city" in team_info:
-            team.city = team_info["city"]
-        if "state" in team_info:
-            team.state = team_info["state"]
-        if "foundation_date" in team_info:
-            team.foundation_date = team_info["foundation_date"]
-        if "logo" in team_info:
-            team.logo = team_info["logo"]
-        team.owner_id = get_jwt_identity()
+        app.logger.debug("Update value: %s", team_info)
+        user_id = get_jwt_identity()
+        versions = if_match_versions()
+        # a compare-and-swap on the row, answered with the row it returns; the
+        # row is only read again if it fails, to tell why
+        statement = update(TeamsModel).where(
+            TeamsModel.id == team_id,
+            or_(TeamsModel.owner_id.is_(None), TeamsModel.owner_id == user_id),
+        )
+        if versions is not None:
+            statement = statement.where(TeamsModel.version.in_(versions))
         try:
-            db.session.add(team)
+            team = db.session.execute(
+                statement.values(owner_id=user_id, **team_info)
+                .returning(*TeamsModel.__table__.columns)
+                .execution_options(synchronize_session=False)
+            ).first()
             db.session.commit()
         except IntegrityError as e:
             abort(400, message=f"Error: {e}")
         except SQLAlchemyError as e:
             abort(500, message=f"Error: {e}")
-        app.logger.debug(f"Team updated: {team}")
+        if team is None:
+            team = db.session.get(TeamsModel, team_id)
+            if team is None:
+                abort(404)
+            if team.owner_id and team.owner_id != user_id:
+                abort(
+                    403,
+                    message="The team must be owned by you or have no owner to be edited.",
+                )
+            abort(412, message="The team was changed since it was read.")
+        app.logger.debug("Team updated: %s", team)
+        return team
+
+
+@blp.route("/team/<int:team_id>/logo")
+class TeamLogo(MethodView):
+    @accept_fallback
+    @login_required
+    @blp.arguments(ImageSchema, location="files")
+    def post(self, files, team_id):
+        app.logger.info(f"Uploading the logo of team {team_id!r}...")
+        team = TeamsModel.query.get_or_404(team_id)
+        if team.owner_id and team.owner_id != current_user.id:
+            flash("The team must be owned by you or have no owner to be edited.")
+            return redirect(url_for("team.Team", team_id=team_id))
+        team.logo = images.save(files["image"])
+        try:
+            db.session.commit()
+        except SQLAlchemyError as e:
+            abort(500, message=f"Error: {e}")
+        app.logger.debug("Team updated: %s", team)
+        flash("Logo uploaded!")
+        return redirect(url_for("team.Team", team_id=team_id, edit=1))
+
+    @post.support("application/json")
+    @jwt_required()
+    @blp.arguments(ImageSchema, location="files")
+    @blp.response(200, schema=TeamSchema)
+    def post_json(self, files, team_id):
+        app.logger.info(f"Uploading the logo of team {team_id!r}...")
+        team = get_editable_team(team_id)
+        team.logo = images.save(files["image"])
+        try:
+            db.session.commit()
+        except SQLAlchemyError as e:
+            abort(500, message=f"Error: {e}")
+        app.logger.debug("Team updated: %s", team)
         return team
 
 
+@blp.route("/team/stats")
+class AllTeamStats(MethodView):
+    @accept("application/json")
+    @jwt_required()
+    @blp.arguments(TeamFilterSchema, location="query", as_kwargs=True)
+    @blp.response(200, TeamStatsSchema(many=True))
+    def get(self, limit, cursor=None, **filters):
+        app.logger.info("Getting the statistics of all the teams...")
+        teams, next_cursor = paginate(
+            db.session.query(TeamsModel.id).filter_by(**filters),
+            TeamsModel.id,
+            limit,
+            cursor,
+        )
+        return (
+            team_stats([team.id for team in teams]),
+            next_link(next_cursor, limit=limit, **filters),
+        )
+
+
+@blp.route("/team/<int:team_id>/stats")
+class TeamStats(MethodView):
+    @accept("application/json")
+    @blp.response(200, TeamStatsSchema)
+    def get(self, team_id):
+        app.logger.info(f"Getting the statistics of team {team_id!r}...")
+        if db.session.get(TeamsModel, team_id) is None:
+            abort(404)
+        return team_stats([team_id])[0]
+
+
 @blp.route("/team/<int:team_id>/players")
 class TeamPlayers(MethodView):
     @accept("application/json")
+    @blp.arguments(SparseSchema, location="query", as_kwargs=True)
     @blp.response(200, PlayerSchema(many=True))
-    def get(self, team_id):
+    def get(self, team_id, only=None, embed=None):
+        version = team_version(team_id)
+        not_modified = version and version.not_modified("json")
+        if not_modified:
+            return not_modified
         team = TeamPlayersModel.query.get_or_404(team_id)
-        team_players = team.players.all()
-        app.logger.debug(f"Players: {[player.__str__() for player in team_players]}")
-        return team_players
+        team_players = team.players.options(*load_columns(PlayersModel, only)).all()
+        app.logger.debug("Players: %s", team_players)
+        return (
+            sparse_response(PlayerSchema, team_players, only, embed, many=True),
+            version.headers("json"),
+        )
+
+    @accept("application/json")
+    @jwt_required()
+    @blp.arguments(PlayerBatchUpdateSchema(many=True))
+    @blp.response(200, BatchResultSchema(many=True))
+    def patch(self, players_info, team_id):
+        app.logger.info(f"Updating {len(players_info)} players of team {team_id!r}...")
+        get_editable_team(team_id)
+        roster = set(
+            db.session.scalars(
+                select(PlayersModel.id).where(
+                    PlayersModel.id.in_([info["id"] for info in players_info]),
+                    or_(
+                        PlayersModel.team_id == team_id, PlayersModel.team_id.is_(None)
+                    ),
+                )
+            )
+        )
+        targets = editable_team_ids(
+            {info["team_id"] for info in players_info if info.get("team_id")},
+            get_jwt_identity(),
+        )
+        now = utcnow()
+        results, rows = [], []
+        for index, info in enumerate(players_info):
+            result = {"index": index, "id": info["id"], "status": 200}
+            if info["id"] not in roster:
+                result["status"] = 404
+                result["message"] = "The player must be in this team or have no team."
+            elif info.get("team_id") and info["team_id"] not in targets:
+                result["status"] = 403
+                result["message"] = (
+                    "The new team must be owned by you or have no owner."
+                )
+            else:
+                rows.append(dict(info, updated_at=now))
+            results.append(result)
+        if rows:
+            try:
+                db.session.execute(update(PlayersModel), rows)
+                db.session.commit()
+            except SQLAlchemyError as e:
+                app.logger.error(e)
+                abort(500, message=f"Error: {e}")
+        app.logger.debug(f"Updated {len(rows)} players.")
+        return results
+
+    @accept("application/json")
+    @jwt_required()
+    @blp.arguments(PlayerIdsSchema)
+    @blp.response(200, BatchResultSchema(many=True))
+    def delete(self, ids_info, team_id):
+        app.logger.info(
+            f"Deleting {len(ids_info['ids'])} players of team {team_id!r}..."
+        )
+        get_editable_team(team_id)
+        roster = set(
+            db.session.scalars(
+                select(PlayersModel.id).where(
+                    PlayersModel.id.in_(ids_info["ids"]),
+                    PlayersModel.team_id == team_id,
+                )
+            )
+        )
+        try:
+            db.session.execute(delete(PlayersModel).where(PlayersModel.id.in_(roster)))
+            db.session.commit()
+        except SQLAlchemyError as e:
+            app.logger.error(e)
+            abort(500, message=f"Error: {e}")
+        app.logger.debug(f"Deleted {len(roster)} players.")
+        results = []
+        for index, player_id in enumerate(ids_info["ids"]):
+            result = {"index": index, "id": player_id, "status": 200}
+            if player_id not in roster:
+                result["status"] = 404
+                result["message"] = "The player is not in this team."
+            results.append(result)
+        return results
 
 
 @blp.route("/team/create")
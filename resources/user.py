@@ -1,4 +1,3 @@
-from datetime import datetime
 from flask import current_app as app, render_template, redirect, url_for, flash
 from flask_accept import accept_fallback, accept
 from flask_jwt_extended import (
@@ -12,11 +11,16 @@ from flask_jwt_extended import (
 from flask_login import login_required, login_user, logout_user, current_user
 from flask.views import MethodView
 from flask_smorest import Blueprint, abort
-from models import TeamModel, TeamsModel, UserModel, BlocklistModel
+from models import TeamModel, TeamsModel, UserModel
 from .db import db
-from .schemas import TeamSchema, UserSchema, UserBaseSchema, NextSchema
+from .blocklist import blocklist
+from .identity import identities
+from .passwords import passwords
+from .sparse import sparse_response, load_columns
+from .schemas import TeamSchema, UserSchema, UserBaseSchema, NextSchema, SparseSchema
+from sqlalchemy import update
 from sqlalchemy.exc import SQLAlchemyError
-from passlib.hash import pbkdf2_sha256
+from sqlalchemy.orm import joinedload
 from .team import blp as TeamBlueprint
 from .player import blp as PlayerBlueprint
 
@@ -25,12 +29,27 @@ blp.register_blueprint(TeamBlueprint, url_prefix="/user")
 blp.register_blueprint(PlayerBlueprint, url_prefix="/user")
 
 
+def check_password(user, password):
+    if not user:
+        return False
+    valid, new_hash = passwords.verify(password, user.password)
+    if new_hash:
+        app.logger.info(f"Rehashing password of user {user.id!r}...")
+        user.password = new_hash
+        db.session.commit()
+    return valid
+
+
 @blp.route("/user/")
 class User(MethodView):
     @accept_fallback
     @login_required
     def get(self):
-        teams = TeamModel.query.filter_by(owner_id=current_user.id).all()
+        teams = (
+            TeamModel.query.options(joinedload(TeamModel.owner))
+            .filter_by(owner_id=current_user.id)
+            .all()
+        )
         return render_template(
             "team/all.html",
             title=f"{current_user.username}'s Teams",
@@ -40,12 +59,17 @@ class User(MethodView):
 
     @get.support("application/json")
     @jwt_required()
+    @blp.arguments(SparseSchema, location="query", as_kwargs=True)
     @blp.response(200, TeamSchema(many=True))
-    def get_json(self):
+    def get_json(self, only=None, embed=None):
         app.logger.info("Getting all the teams...")
-        teams = TeamsModel.query.filter_by(owner_id=get_jwt_identity()).all()
+        teams = (
+            TeamsModel.query.options(*load_columns(TeamsModel, only))
+            .filter_by(owner_id=get_jwt_identity())
+            .all()
+        )
         app.logger.info(f"Found {len(teams)} teams.")
-        return teams
+        return sparse_response(TeamSchema, teams, only, embed, many=True)
 
     @accept_fallback
     @login_required
@@ -53,11 +77,18 @@ class User(MethodView):
         app.logger.info(f"Deleting user {current_user.id}...")
         user = UserModel.query.get_or_404(current_user.id)
         logout_user()
+        # in the same commit, since a new user may be given the same id
+        db.session.execute(
+            update(TeamsModel)
+            .where(TeamsModel.owner_id == user.id)
+            .values(owner_id=None)
+        )
         db.session.delete(user)
         db.session.commit()
-        message = f"Deleted user: {current_user.id!r}"
+        identities.delete(user.id)
+        message = f"Deleted user: {user.id!r}"
         app.logger.debug(message)
-        flash(f"User {current_user.username!r} deleted!")
+        flash(f"User {user.username!r} deleted!")
         return redirect(url_for("home"))
 
 
@@ -66,23 +97,29 @@ class Teams(MethodView):
     @accept_fallback
     def get(self, user_id):
         user = UserModel.query.get_or_404(user_id)
-        app.logger.debug(f"User: {user}")
-        teams = TeamModel.query.filter_by(owner_id=user_id).all()
+        app.logger.debug("User: %s", user)
+        teams = (
+            TeamModel.query.options(joinedload(TeamModel.owner))
+            .filter_by(owner_id=user_id)
+            .all()
+        )
         return render_template(
             "team/all.html",
-            title=f"{user.name}'s Teams",
+            title=f"{user.username}'s Teams",
             teams=teams,
             user=user,
         )
 
     @get.support("application/json")
     @jwt_required()
+    @blp.arguments(SparseSchema, location="query", as_kwargs=True)
     @blp.response(200, UserSchema)
-    def get_json(self, user_id):
+    def get_json(self, user_id, only=None, embed=None):
         app.logger.info(f"Getting user {user_id!r}...")
-        user = UserModel.query.get_or_404(user_id)
-        user.username = user.name
-        return user
+        user = UserModel.query.options(*load_columns(UserModel, only)).get_or_404(
+            user_id
+        )
+        return sparse_response(UserSchema, user, only, embed)
 
 
 @blp.route("/user/signup")
@@ -96,7 +133,7 @@ class Signup(MethodView):
     @accept_fallback
     @blp.arguments(UserSchema, location="form")
     def post(self, user_info):
-        app.logger.debug(user_info)
+        app.logger.debug("Signing up %s", user_info["username"])
         user_name = user_info["username"]
         user_email = user_info["email"]
         if UserModel.query.filter_by(username=user_name).first():
@@ -108,7 +145,7 @@ class Signup(MethodView):
         user = UserModel(
             username=user_name,
             email=user_email,
-            password=pbkdf2_sha256.hash(user_info["password"]),
+            password=passwords.hash(user_info["password"]),
         )
         try:
             db.session.add(user)
@@ -116,7 +153,7 @@ class Signup(MethodView):
         except SQLAlchemyError as e:
             app.logger.error(e)
             abort(500, message=f"Error:{e}")
-        app.logger.debug(f"Created user: {user}")
+        app.logger.debug("Created user: %s", user)
         login_user(user)
         return redirect(url_for("team.CreateTeam"), code=302)
 
@@ -124,6 +161,7 @@ class Signup(MethodView):
     @blp.arguments(UserSchema)
     @blp.response(201, UserSchema)
     def post_json(self, user_info):
+        user_info["password"] = passwords.hash(user_info["password"])
         user = UserModel(**user_info)
         try:
             db.session.add(user)
@@ -131,7 +169,7 @@ class Signup(MethodView):
         except SQLAlchemyError as e:
             app.logger.error(e)
             abort(500, message=f"Error: {e}")
-        app.logger.debug(f"Created user: {user}")
+        app.logger.debug("Created user: %s", user)
         return user, 201
 
 
@@ -147,9 +185,9 @@ class Login(MethodView):
     @blp.arguments(UserBaseSchema, location="form")
     @blp.arguments(NextSchema, location="query", as_kwargs=True)
     def post(self, user_input, **kwargs):
-        app.logger.debug(f"{kwargs}")
+        app.logger.debug("Login arguments: %s", kwargs)
         user = UserModel.query.filter_by(username=user_input["username"]).first()
-        if user and pbkdf2_sha256.verify(user_input["password"], user.password):
+        if check_password(user, user_input["password"]):
             login_user(user, remember="remember" in user_input)
             if "next" in kwargs:
                 return redirect(kwargs["next"])
@@ -161,14 +199,14 @@ class Login(MethodView):
     @blp.arguments(UserBaseSchema)
     def post_json(self, user_input):
         user = UserModel.query.filter_by(username=user_input["username"]).first()
-        if user and pbkdf2_sha256.verify(user_input["password"], user.password):
+        if check_password(user, user_input["password"]):
             refresh_token = create_refresh_token(identity=user.id)
             access_token = create_access_token(
                 identity=user.id,
                 fresh=True,
                 additional_claims={"rjti": get_jti(refresh_token)},
             )
-            app.logger.debug(access_token, refresh_token)
+            app.logger.debug("Issued tokens for user %s", user.id)
             # login_user(user, remember="remember" in user_input)
             return {"access_token": access_token, "refresh_token": refresh_token}
         return abort(401, message="Username or password invalid!")
@@ -186,10 +224,7 @@ class Logout(MethodView):
     @accept("application/json")
     @jwt_required()
     def delete(self):
-        now = datetime.now()
-        db.session.add(BlocklistModel(jti=get_jwt()["jti"], created_at=now))
-        db.session.add(BlocklistModel(jti=get_jwt()["rjti"], created_at=now))
-        db.session.commit()
+        blocklist.revoke(get_jwt()["jti"], get_jwt()["rjti"])
         return {"message": "Logged out!"}
 
 
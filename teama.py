@@ -0,0 +1,16 @@
+import teamz
+import logging
+from flask_migrate import upgrade
+from resources.asgi import AsyncAPI
+
+
+def create_app():
+    app = teamz.create_app()
+    uvicorn_logger = logging.getLogger("uvicorn.error")
+    app.logger.handlers = uvicorn_logger.handlers
+    app.logger.setLevel(uvicorn_logger.level)
+
+    with app.app_context():
+        upgrade()
+
+    return AsyncAPI(app)
@@ -1,3 +1,4 @@
+import click
 from datetime import timedelta
 from flask import Flask, render_template, redirect, url_for
 from flask_jwt_extended import JWTManager
@@ -6,9 +7,20 @@ from flask_smorest import Api
 from resources.team import blp as TeamBlueprint
 from resources.player import blp as PlayerBlueprint
 from resources.user import blp as UserBlueprint
+from resources.search import blp as SearchBlueprint, include_name
+from resources.export import blp as ExportBlueprint, exports, TABLES, FORMATS
+from resources.imports import blp as ImportBlueprint, importer, guess_format
 from flask_migrate import Migrate
-from resources.db import db
-from models import UserModel, BlocklistModel
+from resources.db import db, configure_database, init_sqlite
+from resources.blocklist import blocklist
+from resources.identity import identities
+from resources.passwords import passwords
+from resources.pages import pages
+from resources.instrumentation import instrumentation
+from resources.images import images
+from resources.jobs import jobs
+from resources.respserver import RESPServer
+from models.user import UsersModel
 
 
 def create_app():
@@ -22,14 +34,27 @@ def create_app():
     app.config[
         "OPENAPI_SWAGGER_UI_URL"
     ] = "https://cdn.jsdelivr.net/npm/swagger-ui-dist/"
-    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///data.db"
+    configure_database(app)
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
     app.config["JWT_SECRET_KEY"] = "1234"
     app.config["JWT_ACCESS_TOKEN_EXPIRES"] = timedelta(hours=1)
+    # tokens carry the integer user id as subject, which PyJWT >= 2.10 rejects
+    app.config["JWT_VERIFY_SUB"] = False
+    app.config["SEARCH_INDEX_TTL"] = 30
 
     db.init_app(app)
-    migrate = Migrate(app, db, render_as_batch=True)
+    init_sqlite(app)
+    migrate = Migrate(app, db, render_as_batch=True, include_name=include_name)
     jwt_manager = JWTManager(app)
+    blocklist.init_app(app)
+    identities.init_app(app)
+    passwords.init_app(app)
+    pages.init_app(app)
+    instrumentation.init_app(app)
+    images.init_app(app)
+    jobs.init_app(app)
+    exports.init_app(app)
+    importer.init_app(app)
 
     @app.get("/")
     def home():
@@ -43,6 +68,9 @@ def create_app():
     api.register_blueprint(TeamBlueprint)
     api.register_blueprint(PlayerBlueprint)
     api.register_blueprint(UserBlueprint)
+    api.register_blueprint(SearchBlueprint)
+    api.register_blueprint(ExportBlueprint)
+    api.register_blueprint(ImportBlueprint)
 
     login_manager = LoginManager()
     login_manager.login_view = "user.Login"
@@ -52,17 +80,71 @@ def create_app():
     @login_manager.user_loader
     def load_user(user_id):
         # since the user_id is just the primary key of our user table, use it in the query for the user
-        return UserModel.query.get(int(user_id))
+        return identities.load(int(user_id))
 
     @jwt_manager.token_in_blocklist_loader
     def check_if_token_revoked(jwt_header, jwt_payload: dict) -> bool:
-        jti = jwt_payload["jti"]
-        token = BlocklistModel.query.filter_by(jti=jti).scalar()
-        return token is not None
+        return blocklist.is_revoked(jwt_payload["jti"])
 
     @jwt_manager.user_lookup_loader
     def user_lookup_callback(_jwt_header, jwt_data):
         identity = jwt_data["sub"]
-        return UserModel.query.get(int(identity))
+        return identities.load(int(identity))
+
+    @app.cli.command("cache-server")
+    @click.option("--host", default="127.0.0.1")
+    @click.option("--port", default=6379)
+    @click.option("--max-keys", default=100_000, show_default=True)
+    def cache_server(host, port, max_keys):
+        """Run an in-memory stand-in for a Redis server (CACHE_URL=redis://)."""
+        click.echo(f"Serving the cache on {host}:{port}...")
+        RESPServer((host, port), max_keys).serve_forever()
+
+    @app.cli.command("worker")
+    @click.option("--processes", default=1, show_default=True)
+    @click.option("--burst", is_flag=True, help="Exit once no job is due.")
+    def worker(processes, burst):
+        """Run the jobs queued by requests."""
+        jobs.run_workers(processes, burst)
+
+    @app.cli.command("export-snapshot")
+    @click.argument("tables", nargs=-1, type=click.Choice(list(TABLES)))
+    @click.option("--format", "formats", multiple=True, type=click.Choice(FORMATS))
+    def export_snapshot(tables, formats):
+        """Write snapshots of the tables (all by default) under storage/exports."""
+        if not formats and "parquet" not in FORMATS:
+            click.echo(
+                "Skipping Parquet, which needs pyarrow to be installed.", err=True
+            )
+        for table in tables or TABLES:
+            for format in formats or FORMATS:
+                click.echo(exports.snapshot(table, format))
+
+    @app.cli.command("import")
+    @click.argument("table", type=click.Choice(["teams", "players"]))
+    @click.argument("path", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--format", type=click.Choice(["csv", "ndjson"]))
+    @click.option("--owner", help="Username to give the imported teams to.")
+    def import_rows(table, path, format, owner):
+        """Import teams or players from a CSV or NDJSON file."""
+        format = format or guess_format(path)
+        if format is None:
+            raise click.UsageError("Give the --format of the file.")
+        owner_id = None
+        if owner is not None:
+            user = UsersModel.query.filter_by(username=owner).first()
+            if user is None:
+                raise click.BadParameter(f"No user {owner!r}.", param_hint="--owner")
+            owner_id = user.id
+        with open(path, encoding="utf-8-sig", newline="") as lines:
+            report = importer.load(table, lines, format, owner_id)
+        for error in report["errors"]:
+            click.echo(
+                f"Row {error['index']}: {error['status']} {error['message']}",
+                err=True,
+            )
+        click.echo(
+            f"Imported {report['created']} {table}, rejected {report['failed']}."
+        )
 
     return app
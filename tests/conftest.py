@@ -0,0 +1,72 @@
+import threading
+import pytest
+from sqlalchemy import event
+import teamz
+from resources.db import db
+from resources.respserver import RESPServer
+
+JSON = {"Accept": "application/json"}
+
+
+@pytest.fixture
+def shared_cache(monkeypatch):
+    """Points ``CACHE_URL`` at a stand-in Redis server, for tests of what
+    the ``memory://`` cache does not share; use it before ``app``."""
+
+    server = RESPServer(("127.0.0.1", 0))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, port = server.server_address
+    monkeypatch.setenv("CACHE_URL", f"redis://{host}:{port}/0")
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'teamz.db'}")
+    app = teamz.create_app()
+    app.config.update(TESTING=True, JOB_THREADS=0)
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    """A client logged in, by the signup form, as the user ``u``."""
+
+    client = app.test_client()
+    client.post(
+        "/user/signup", data={"username": "u", "email": "u@x.com", "password": "p"}
+    )
+    return client
+
+
+@pytest.fixture
+def headers(client):
+    """JSON request headers carrying an access token of ``u``."""
+
+    response = client.post(
+        "/user/login", json={"username": "u", "password": "p"}, headers=JSON
+    )
+    return dict(JSON, Authorization=f"Bearer {response.json['access_token']}")
+
+
+@pytest.fixture
+def statements(app):
+    """The SQL statements run while the test does, cleared as needed."""
+
+    executed = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        executed.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    yield executed
+    event.remove(engine, "before_cursor_execute", before_cursor_execute)
@@ -0,0 +1,29 @@
+def test_batch_results_match_the_rows_sent(app, client, headers, statements):
+    team = client.post("/team/", json={"name": "T1"}, headers=headers).json
+    other = app.test_client()
+    other.post(
+        "/user/signup", data={"username": "v", "email": "v@x.com", "password": "p"}
+    )
+    token = other.post(
+        "/user/login", json={"username": "v", "password": "p"}, headers=headers
+    ).json["access_token"]
+    foreign = other.post(
+        "/team/",
+        json={"name": "T2"},
+        headers=dict(headers, Authorization=f"Bearer {token}"),
+    ).json
+    players = [
+        {"name": "P1", "team_id": team["id"]},
+        {"name": "P2", "team_id": foreign["id"]},
+        {"name": "P3"},
+        {"name": "P4", "team_id": team["id"]},
+    ]
+    statements.clear()
+    results = client.post("/player/batch", json=players, headers=headers).json
+    inserts = [s for s in statements if s.startswith("INSERT INTO players")]
+    assert len(inserts) == 1
+    assert [result["status"] for result in results] == [201, 403, 201, 201]
+    for player, result in zip(players, results):
+        if result["status"] == 201:
+            response = client.get(f"/player/{result['id']}", headers=headers)
+            assert response.json["name"] == player["name"]
@@ -0,0 +1,24 @@
+from datetime import datetime, timedelta
+from models import BlocklistModel
+from resources.blocklist import BlocklistCache
+from resources.db import db
+
+
+def test_every_process_drops_revocations_of_expired_tokens(app):
+    app.config["JWT_BLOCKLIST_PRUNE_INTERVAL"] = timedelta(0)
+    with app.app_context():
+        cache = BlocklistCache(app)
+        now = datetime.now()
+        expired = now - app.config["JWT_REFRESH_TOKEN_EXPIRES"] - timedelta(minutes=1)
+        db.session.add_all(
+            [
+                BlocklistModel(jti="expired-row", created_at=expired),
+                BlocklistModel(jti="valid-row", created_at=now),
+            ]
+        )
+        db.session.commit()
+        # revoked through this process while the token was still valid
+        cache._revoked["expired-here"] = expired
+        assert cache.is_revoked("valid-row")
+        assert not cache.is_revoked("expired-row")
+        assert set(cache._revoked) == {"valid-row"}
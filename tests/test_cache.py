@@ -0,0 +1,64 @@
+import threading
+import pytest
+from resources.cache import Cache, _key_locks, _stripes
+from resources.respserver import Store
+
+
+def same_stripe_keys(cache):
+    """Two keys whose single-flight locks share a stripe."""
+
+    stripes = {}
+    for i in range(10 * len(_stripes)):
+        stripe = hash(f"{cache.namespace}:lock:k{i}") % len(_stripes)
+        if stripe in stripes:
+            return stripes[stripe], f"k{i}"
+        stripes[stripe] = f"k{i}"
+
+
+def test_nested_get_or_set_on_the_same_stripe(app):
+    cache = Cache("test")
+    with app.app_context():
+        cache.init_app(app)
+        outer, inner = same_stripe_keys(cache)
+        result = []
+        thread = threading.Thread(
+            target=lambda: result.append(
+                cache.get_or_set(outer, lambda: cache.get_or_set(inner, lambda: 1))
+            )
+        )
+        thread.start()
+        thread.join(timeout=5)
+        assert not thread.is_alive(), "deadlocked"
+        assert result == [1]
+        assert cache.get(inner) == 1
+    assert not _key_locks
+
+
+def test_store_evicts_least_recently_used_keys_with_an_expiry():
+    store = Store(max_keys=3)
+    store.execute(b"INCR", b"generation")
+    store.execute(b"SET", b"a", b"1", b"PX", b"60000")
+    store.execute(b"SET", b"b", b"2", b"PX", b"60000")
+    store.execute(b"GET", b"a")
+    store.execute(b"SET", b"c", b"3", b"PX", b"60000")
+    assert list(store.items) == [b"generation", b"a", b"c"]
+    store.execute(b"SET", b"d", b"4", b"PX", b"60000")
+    assert store.execute(b"GET", b"generation") == b"1"
+    assert len(store.items) == 3
+
+
+def test_invalidated_namespaces_warn_per_process(app, caplog):
+    app.testing = False
+    with app.app_context():
+        Cache("plain").init_app(app)
+        assert not caplog.records
+        Cache("test", invalidated=True).init_app(app)
+    assert "The test cache is only invalidated" in caplog.text
+
+
+@pytest.mark.usefixtures("shared_cache")
+def test_shared_namespaces_do_not_warn(app, caplog):
+    app.testing = False
+    with app.app_context():
+        Cache("test", versioned=True).init_app(app)
+    assert not caplog.records
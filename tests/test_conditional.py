@@ -0,0 +1,53 @@
+from email.utils import format_datetime
+from datetime import datetime, timezone
+
+
+def test_deleting_from_a_collection_is_not_hidden_by_if_modified_since(client, headers):
+    team = client.post("/team/", json={"name": "T1"}, headers=headers).json
+    players = [
+        client.post(
+            "/player/", json={"name": name, "team_id": team["id"]}, headers=headers
+        ).json
+        for name in ("P1", "P2")
+    ]
+    url = f"/team/{team['id']}"
+    response = client.get(url, headers=headers)
+    assert "Last-Modified" not in response.headers
+    etag = response.headers["ETag"]
+    client.delete(f"/player/{players[0]['id']}", headers=headers)
+    now = format_datetime(datetime.now(timezone.utc), usegmt=True)
+    response = client.get(url, headers=dict(headers, **{"If-Modified-Since": now}))
+    assert response.status_code == 200
+    assert [player["name"] for player in response.json["players"]] == ["P2"]
+    response = client.get(url, headers=dict(headers, **{"If-None-Match": etag}))
+    assert response.status_code == 200
+
+
+def test_single_rows_keep_last_modified(client, headers):
+    player = client.post("/player/", json={"name": "P1"}, headers=headers).json
+    response = client.get(f"/player/{player['id']}", headers=headers)
+    last_modified = response.headers["Last-Modified"]
+    response = client.get(
+        f"/player/{player['id']}",
+        headers=dict(headers, **{"If-Modified-Since": last_modified}),
+    )
+    assert response.status_code == 304
+
+
+def test_updates_are_answered_without_reading_the_row_back(client, headers, statements):
+    team = client.post("/team/", json={"name": "T1"}, headers=headers).json
+    player = client.post(
+        "/player/", json={"name": "P1", "team_id": team["id"]}, headers=headers
+    ).json
+    for url, table, changes in [
+        (f"/team/{team['id']}", "teams", {"city": "Rio"}),
+        (f"/player/{player['id']}", "players", {"position": "GK"}),
+    ]:
+        statements.clear()
+        response = client.put(
+            url, json=changes, headers=dict(headers, **{"If-Match": '"1"'})
+        )
+        assert response.status_code == 200
+        assert response.json["version"] == 2
+        assert response.json.items() >= changes.items()
+        assert not [s for s in statements if s.startswith("SELECT") and table in s]
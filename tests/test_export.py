@@ -0,0 +1,17 @@
+def signup(app, username):
+    client = app.test_client()
+    client.post(
+        "/user/signup",
+        data={"username": username, "email": f"{username}@x.com", "password": "p"},
+    )
+    return client
+
+
+def test_snapshots_do_not_outlive_reused_ids(app, client, headers):
+    deleted = signup(app, "v")
+    assert b"v@x.com" in client.get("/export/users.csv", headers=headers).data
+    deleted.delete("/user/")
+    signup(app, "w")
+    snapshot = client.get("/export/users.csv", headers=headers).data
+    assert b"v@x.com" not in snapshot
+    assert b"w@x.com" in snapshot
@@ -0,0 +1,37 @@
+import io
+import pytest
+from PIL import Image
+from resources.images import images
+
+
+def png(width, height):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def upload(client, headers, tmp_path, monkeypatch):
+    monkeypatch.setattr(images, "directory", str(tmp_path))
+    team = client.post("/team/", json={"name": "T1"}, headers=headers).json
+
+    def upload(data):
+        return client.post(
+            f"/team/{team['id']}/logo",
+            data={"image": (io.BytesIO(data), "logo.png")},
+            headers=headers,
+            content_type="multipart/form-data",
+        )
+
+    return upload
+
+
+def test_images_of_too_many_pixels_are_refused(upload, monkeypatch):
+    monkeypatch.setattr(images, "max_pixels", 100)
+    assert upload(png(10, 10)).status_code == 200
+    assert upload(png(10, 11)).status_code == 413
+
+
+def test_decompression_bombs_are_refused(upload, monkeypatch):
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 100)
+    assert upload(png(20, 20)).status_code == 413
@@ -0,0 +1,30 @@
+import pytest
+from conftest import JSON
+
+
+@pytest.fixture(autouse=True)
+def instrumented(monkeypatch):
+    monkeypatch.setenv("INSTRUMENTATION", "1")
+    monkeypatch.setenv("PROFILE_SECRET", "s3cret")
+
+
+def profiled(client):
+    metrics = client.get("/metrics").data.decode()
+    return sum(
+        float(line.rsplit(" ", 1)[1])
+        for line in metrics.splitlines()
+        if line.startswith("teamz_profiled_requests_total{")
+    )
+
+
+@pytest.mark.parametrize(
+    "value, debug, expected",
+    [("1", False, 0), ("wrong", False, 0), ("s3cret", False, 1), ("1", True, 1)],
+)
+def test_profiling_on_request_needs_the_secret(app, value, debug, expected):
+    app.debug = debug
+    client = app.test_client()
+    # the metrics are kept by the process, across apps
+    before = profiled(client)
+    client.get("/team/", headers=dict(JSON, **{"X-Profile": value}))
+    assert profiled(client) - before == expected
@@ -0,0 +1,64 @@
+"""Models are logged lazily, as arguments of DEBUG records, so that a
+request logged at INFO never builds their ``repr``."""
+
+import logging
+import pytest
+from resources.db import ReprMixin
+
+
+def exercise(client, headers):
+    responses = []
+    team = client.post("/team/", json={"name": "T1", "state": "RJ"}, headers=headers)
+    team_id = team.json["id"]
+    player = client.post(
+        "/player/", json={"name": "P1", "team_id": team_id}, headers=headers
+    )
+    player_id = player.json["id"]
+    responses += [
+        team,
+        player,
+        client.post("/player/batch", json=[{"name": "P2"}], headers=headers),
+        client.put(f"/team/{team_id}", json={"city": "Rio"}, headers=headers),
+        client.put(f"/player/{player_id}", json={"position": "GK"}, headers=headers),
+        client.patch(
+            f"/team/{team_id}/players",
+            json=[{"id": player_id, "position": "CB"}],
+            headers=headers,
+        ),
+    ]
+    for url in ["/team/", "/player/", f"/team/{team_id}", f"/player/{player_id}"]:
+        responses += [client.get(url), client.get(url, headers=headers)]
+    responses += [
+        client.get(f"/team/{team_id}/players", headers=headers),
+        client.get("/user/"),
+        client.get("/user/1"),
+        client.delete(f"/player/{player_id}", headers=headers),
+        client.delete(f"/team/{team_id}", headers=headers),
+    ]
+    return [response.status_code for response in responses]
+
+
+@pytest.fixture
+def reprs(monkeypatch):
+    """Counts the ``repr`` of models built while the test runs."""
+
+    calls = []
+    original = ReprMixin.__repr__
+
+    def counting_repr(self):
+        calls.append(type(self).__name__)
+        return original(self)
+
+    monkeypatch.setattr(ReprMixin, "__repr__", counting_repr)
+    return calls
+
+
+@pytest.mark.parametrize("level, serialized", [("INFO", False), ("DEBUG", True)])
+def test_models_are_only_serialized_for_debug_records(
+    app, client, headers, reprs, caplog, level, serialized
+):
+    caplog.set_level(level, logger=app.logger.name)
+    assert all(status < 400 for status in exercise(client, headers))
+    # formats every record that was emitted
+    assert caplog.text
+    assert bool(reprs) == serialized, reprs
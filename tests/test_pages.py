@@ -0,0 +1,58 @@
+import pytest
+from flask import template_rendered
+
+
+@pytest.fixture
+def renders(app):
+    """The templates rendered while the test does."""
+
+    rendered = []
+
+    def record(sender, template, context, **extra):
+        rendered.append(template.name)
+
+    template_rendered.connect(record, app)
+    yield rendered
+    template_rendered.disconnect(record, app)
+
+
+@pytest.mark.usefixtures("shared_cache")
+def test_writes_only_drop_the_pages_showing_them(client, headers, renders):
+    first, second = (
+        client.post("/team/", json={"name": name}, headers=headers).json
+        for name in ("T1", "T2")
+    )
+    player = client.post(
+        "/player/", json={"name": "P1", "team_id": first["id"]}, headers=headers
+    ).json
+    urls = ["/team/", f"/team/{first['id']}", f"/team/{second['id']}"]
+    for url in urls:
+        client.get(url)
+    renders.clear()
+    for url in urls:
+        assert client.get(url).status_code == 200
+    assert renders == []
+
+    client.put(f"/player/{player['id']}", json={"name": "P2"}, headers=headers)
+    for url in urls:
+        client.get(url)
+    assert len(renders) == 1
+    assert b"P2" in client.get(f"/team/{first['id']}").data
+
+    renders.clear()
+    client.put(f"/team/{second['id']}", json={"stadium": "Maracana"}, headers=headers)
+    for url in urls:
+        client.get(url)
+    assert len(renders) == 2
+    assert b"Maracana" in client.get(f"/team/{second['id']}").data
+
+
+def test_lists_are_not_cached_per_process(client, headers, renders):
+    team = client.post("/team/", json={"name": "T1"}, headers=headers).json
+    urls = ["/team/", "/player/", f"/team/{team['id']}"]
+    for url in urls:
+        client.get(url)
+    renders.clear()
+    for url in urls:
+        client.get(url)
+    assert len(renders) == 2
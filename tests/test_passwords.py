@@ -0,0 +1,24 @@
+import os
+from flask import Flask
+from resources.passwords import PasswordHasher
+
+
+def test_web_workers_share_the_cpus(monkeypatch):
+    monkeypatch.setattr(os, "cpu_count", lambda: 8)
+    monkeypatch.setenv("WEB_CONCURRENCY", "3")
+    hasher = PasswordHasher(Flask(__name__))
+    assert hasher.workers == 2
+    monkeypatch.setenv("WEB_CONCURRENCY", "16")
+    assert PasswordHasher(Flask(__name__)).workers == 1
+
+
+def test_pool_is_spawned():
+    app = Flask(__name__)
+    app.config.update(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_ROUNDS=1000)
+    hasher = PasswordHasher(app)
+    try:
+        ok, rehashed = hasher.verify("p", hasher.hash("p"))
+        assert ok and rehashed is None
+        assert hasher._get_executor()._mp_context.get_start_method() == "spawn"
+    finally:
+        hasher._get_executor().shutdown()
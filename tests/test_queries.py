@@ -0,0 +1,53 @@
+"""The HTML pages load their related rows eagerly, so the number of
+statements they run does not grow with the number of rows they show."""
+
+import pytest
+from datetime import date
+from models import PlayerModel, TeamModel, UserModel
+from resources.db import db
+
+SIZES = (1, 5, 25)
+PAGES = ["/team/", "/player/", "/user/", "/user/1", "/team/1", "/player/1"]
+
+
+def seed(app, size):
+    """``size`` teams of ``u`` and ``size`` teams of as many other users, with
+    ``size`` players each, replacing any."""
+
+    with app.app_context():
+        db.session.query(PlayerModel).delete()
+        db.session.query(TeamModel).delete()
+        db.session.query(UserModel).filter(UserModel.id != 1).delete()
+        owners = [1] * size
+        for i in range(size):
+            owner = UserModel(username=f"o{i}", email=f"o{i}@x.com", password="-")
+            db.session.add(owner)
+            db.session.flush()
+            owners.append(owner.id)
+        for i, owner_id in enumerate(owners):
+            team = TeamModel(name=f"Team {i}", owner_id=owner_id, state="SP")
+            db.session.add(team)
+            db.session.flush()
+            db.session.add_all(
+                PlayerModel(
+                    name=f"Player {i}-{j}",
+                    position="GK",
+                    birth_date=date(2000, 1, 1),
+                    team_id=team.id,
+                )
+                for j in range(size)
+            )
+        db.session.commit()
+
+
+@pytest.mark.parametrize("url", PAGES)
+def test_statements_per_page_do_not_grow_with_rows(app, client, statements, url):
+    client.get("/")  # loads the identity of the user into its cache
+    counts = []
+    for size in SIZES:
+        seed(app, size)
+        statements.clear()
+        response = client.get(url)
+        assert response.status_code == 200
+        counts.append(len(statements))
+    assert counts == [counts[0]] * len(SIZES), statements
@@ -0,0 +1,80 @@
+"""The dump functions generated for the schemas give the same output as
+marshmallow's own ``Schema.dump``."""
+
+import pytest
+from datetime import date
+from types import SimpleNamespace
+from marshmallow import Schema
+from models import PlayerModel, PlayersModel, TeamModel, TeamsModel, UserModel
+from resources.db import db
+from resources.serializers import FastSchema
+import resources.schemas  # noqa: F401, defines the schemas
+
+
+def subclasses(cls):
+    for subclass in cls.__subclasses__():
+        yield subclass
+        yield from subclasses(subclass)
+
+
+SCHEMAS = sorted(set(subclasses(FastSchema)), key=lambda cls: cls.__name__)
+
+
+@pytest.fixture
+def objs(app, client):
+    """Rows and plain objects with every kind of value the schemas dump."""
+
+    with app.app_context():
+        full = TeamModel(
+            name="Full",
+            foundation_date=date(1900, 1, 2),
+            city="Rio",
+            state="RJ",
+            stadium="S",
+            logo="/images/logo.png",
+            owner_id=1,
+        )
+        # no players, no dates and no owner
+        empty = TeamModel(name="Empty")
+        db.session.add_all([full, empty])
+        db.session.flush()
+        db.session.add_all(
+            [
+                PlayerModel(
+                    name="Dated",
+                    position="GK",
+                    birth_date=date(2000, 1, 1),
+                    portrait="/images/portrait.png",
+                    team_id=full.id,
+                ),
+                PlayerModel(name="Undated", team_id=full.id),
+                PlayerModel(name="Free agent"),
+            ]
+        )
+        db.session.commit()
+        rows = (
+            TeamModel.query.order_by(TeamModel.id).all()
+            + TeamsModel.query.order_by(TeamsModel.id).all()
+            + PlayerModel.query.order_by(PlayerModel.id).all()
+            + PlayersModel.query.order_by(PlayersModel.id).all()
+            + UserModel.query.all()
+        )
+        # objects missing the optional attributes, as sparse rows are
+        sparse = [
+            SimpleNamespace(id=1, name="Sparse"),
+            SimpleNamespace(name="Nulls", birth_date=None, foundation_date=None),
+            SimpleNamespace(name="No players", players=[], teams=[]),
+            SimpleNamespace(name="No team", team=None),
+        ]
+        yield rows + sparse
+
+
+@pytest.mark.parametrize("schema_class", SCHEMAS, ids=lambda cls: cls.__name__)
+def test_generated_dump_matches_marshmallow(objs, schema_class):
+    schema = schema_class()
+    assert schema._dumper is not None, "dumped by marshmallow"
+    for obj in objs:
+        assert schema.dump(obj) == Schema.dump(schema, obj), obj
+    assert schema.dump(objs, many=True) == Schema.dump(schema, objs, many=True)
+    many = schema_class(many=True)
+    assert many.dump(objs) == Schema.dump(many, objs)